@@ -1,6 +1,14 @@
-from flask import Blueprint, request, render_template, redirect, url_for, session, flash, jsonify, send_file
+from flask import Blueprint, request, render_template, redirect, url_for, session, flash, jsonify, send_file, Response, abort
 import database as db
-import datetime
+import exports
+import metrics
+import sqltrace
+import base64
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -12,17 +20,98 @@ def dashboard():
     
     user_id = session['user_id']
     user = db.get_user_by_id(user_id)
-    all_students = db.get_all_students()
-    eligible_students = db.get_eligible_students()
     criteria = db.get_eligibility_criteria()
     
+    # The student tables are filled page by page from admin.students_api
     return render_template('dashboard.html', 
                           user=user, 
-                          all_students=all_students,
-                          eligible_students=eligible_students,
+                          student_count=db.count_students(),
+                          eligible_count=db.count_students({'eligible': True}),
                           criteria=criteria,
                           role='admin')
 
+def encode_cursor(after):
+    """Opaque page cursor for a (sort value, user ID) pair"""
+    return base64.urlsafe_b64encode(json.dumps(after).encode()).decode()
+
+def decode_cursor(cursor):
+    after = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(after, list) or len(after) != 2 or not isinstance(after[1], int):
+        raise ValueError('Malformed cursor')
+    return after
+
+def parse_student_filters(args):
+    """Roster filters from query string arguments"""
+    def flag(name):
+        value = args.get(name, '')
+        if value == '':
+            return None
+        if value not in ('0', '1', 'true', 'false'):
+            raise ValueError(f'{name} must be 0 or 1')
+        return value in ('1', 'true')
+    
+    def number(name, kind=float):
+        value = args.get(name, '')
+        return kind(value) if value != '' else None
+    
+    filters = {
+        'department': args.get('department') or None,
+        'specialization': args.get('specialization') or None,
+        'eligible': flag('eligible'),
+        'approved': flag('approved'),
+        'min_cgpa': number('min_cgpa'),
+        'max_cgpa': number('max_cgpa'),
+        'min_leetcode': number('min_leetcode', int),
+        'max_leetcode': number('max_leetcode', int),
+        'search': args.get('q', '').strip() or None
+    }
+    # The eligible-students table is the roster with the eligibility filter
+    if args.get('list') == 'eligible':
+        filters['eligible'] = True
+    return filters
+
+@admin_bp.route('/admin/api/students')
+def students_api():
+    """Filtered, sorted page of the student roster
+    
+    Query arguments: department, specialization, eligible, approved,
+    min_cgpa, max_cgpa, min_leetcode, max_leetcode, q (username or skills
+    search), columns (comma separated), sort, order, limit and cursor.
+    """
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    try:
+        filters = parse_student_filters(request.args)
+        sort = request.args.get('sort', 'name')
+        if sort not in db.STUDENT_SORT_KEYS:
+            raise ValueError(f'Unknown sort key: {sort}')
+        columns = [c for c in request.args.get('columns', '').split(',') if c] or None
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        limit = int(request.args.get('limit', 25))
+        
+        students, next_after = db.get_students_page(
+            filters=filters,
+            columns=columns,
+            sort=sort,
+            descending=request.args.get('order') == 'desc',
+            limit=limit,
+            after=after
+        )
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Invalid request: {str(e)}'}), 400
+    
+    response = {
+        'success': True,
+        'students': students,
+        'next_cursor': encode_cursor(next_after) if next_after else None
+    }
+    # The total only matters when starting a new listing
+    if not cursor:
+        response['total'] = db.count_students(filters)
+    return jsonify(response)
+
 @admin_bp.route('/admin/students_by_department/<department>')
 def students_by_department(department):
     """Get students by department"""
@@ -32,6 +121,15 @@ def students_by_department(department):
     students = db.get_all_students_by_department(department)
     return jsonify({'students': students})
 
+@admin_bp.route('/admin/students_by_project_domain/<domain>')
+def students_by_project_domain(domain):
+    """Get students with a project in the given domain"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return redirect(url_for('index'))
+    
+    students = db.get_students_by_project_domain(domain)
+    return jsonify({'students': students})
+
 @admin_bp.route('/admin/eligibility_criteria', methods=['GET', 'POST'])
 def eligibility_criteria():
     """View and update eligibility criteria"""
@@ -44,9 +142,7 @@ def eligibility_criteria():
     
     if request.method == 'POST':
         try:
-            # Print received form data for debugging
             form_data = request.form
-            print("Received form data:", form_data)
             
             # Update criteria
             new_criteria = {
@@ -61,10 +157,9 @@ def eligibility_criteria():
                 'require_linkedin_profile': 1 if form_data.get('require_linkedin_profile') else 0
             }
             
-            # Print criteria for debugging
-            print("New criteria values:", new_criteria)
-            
             success = db.update_eligibility_criteria(new_criteria)
+            import eligibility
+            eligibility.invalidate_preview()
             
             if success:
                 flash('Eligibility criteria updated successfully', 'success')
@@ -75,15 +170,74 @@ def eligibility_criteria():
             return redirect(url_for('admin.eligibility_criteria'))
         except Exception as e:
             flash(f'Error updating criteria: {str(e)}', 'error')
-            print(f"Error updating criteria: {str(e)}")
+            logger.exception("Error updating criteria")
             return redirect(url_for('admin.eligibility_criteria'))
     
     # Get updated criteria
     criteria = db.get_eligibility_criteria()
-    print("Retrieved criteria for display:", criteria)
     
     return render_template('dashboard.html', user=user, criteria=criteria, tab='criteria', role='admin')
 
+@admin_bp.route('/admin/eligibility_preview')
+def eligibility_preview():
+    """Preview the effect of candidate criteria without saving them"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    current = db.get_eligibility_criteria() or {}
+    try:
+        # Thresholds not given fall back to the saved criteria
+        candidate = {
+            'min_attendance': float(request.args.get('min_attendance', current.get('min_attendance', 85.0))),
+            'min_assessment_score': float(request.args.get('min_assessment_score', current.get('min_assessment_score', 80.0))),
+            'min_cgpa': float(request.args.get('min_cgpa', current.get('min_cgpa', 8.5))),
+            'min_leetcode_problems': int(request.args.get('min_leetcode_problems', current.get('min_leetcode_problems', 100))),
+            'min_projects': int(request.args.get('min_projects', current.get('min_projects', 3))),
+            'require_portfolio': int(request.args.get('require_portfolio', current.get('require_portfolio', 1))),
+            'require_leetcode_profile': int(request.args.get('require_leetcode_profile', current.get('require_leetcode_profile', 0))),
+            'require_github_profile': int(request.args.get('require_github_profile', current.get('require_github_profile', 0))),
+            'require_linkedin_profile': int(request.args.get('require_linkedin_profile', current.get('require_linkedin_profile', 0)))
+        }
+        limit = max(1, min(int(request.args.get('limit', 20)), 200))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid criteria: {str(e)}'}), 400
+    
+    # The preview engine pulls in NumPy, so it is only loaded once it is used
+    import eligibility
+    
+    start = time.perf_counter()
+    result = eligibility.get_criteria_preview().preview(candidate, limit=limit)
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    result['success'] = True
+    return jsonify(result)
+
+@admin_bp.route('/admin/eligibility_failures')
+def eligibility_failures():
+    """Count the criteria students fail, per department"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    departments = db.get_eligibility_failures(request.args.get('department') or None)
+    return jsonify({'success': True, 'criteria': list(db.CRITERION_BITS), 'departments': departments})
+
+@admin_bp.route('/admin/near_miss_students')
+def near_miss_students():
+    """List the students who fail exactly one criterion, optionally a given one"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), 500))
+        students = db.get_near_miss_students(
+            criterion=request.args.get('criterion') or None,
+            department=request.args.get('department') or None,
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid request: {str(e)}'}), 400
+
+    return jsonify({'success': True, 'students': students})
+
 @admin_bp.route('/admin/approve_student/<int:student_id>', methods=['POST'])
 def approve_student(student_id):
     """Approve or reject a student for placement"""
@@ -92,21 +246,81 @@ def approve_student(student_id):
     
     try:
         approved_str = request.form.get('approved', 'false')
-        print(f"Received approval request: student_id={student_id}, approved={approved_str}")
         
         # Convert string to boolean
         approved = approved_str.lower() == 'true'
         
         success = db.approve_student(student_id, approved)
+        logger.info("Approval changed", extra={'student_id': student_id, 'approved': approved,
+                                               'success': success, 'sample': True})
         
         if not success:
             return jsonify({'success': False, 'message': 'Failed to update approval status'}), 500
         
         return jsonify({'success': True})
     except Exception as e:
-        print(f"Error approving student: {str(e)}")
+        logger.exception("Error approving student", extra={'student_id': student_id})
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
+# Filters accepted by the bulk approval API, as in the roster query string
+BULK_FILTER_KEYS = {
+    'department', 'specialization', 'eligible', 'approved', 'min_cgpa', 'max_cgpa',
+    'min_leetcode', 'max_leetcode', 'q'
+}
+
+@admin_bp.route('/admin/approve_students', methods=['POST'])
+def approve_students():
+    """Approve or reject many students at once
+    
+    JSON body: {"approved": true|false, "ids": [...]} and/or
+    {"filters": {...}} with the roster filters, e.g. every eligible CSE
+    student with a CGPA of at least 9 is
+    {"filters": {"department": "CSE", "eligible": 1, "min_cgpa": 9}}.
+    """
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    payload = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(payload.get('approved'), bool):
+            raise ValueError('approved must be true or false')
+        
+        ids = payload.get('ids')
+        if ids is not None and (not isinstance(ids, list) or not ids):
+            raise ValueError('ids must be a non-empty list')
+        
+        filters = None
+        if payload.get('filters') is not None:
+            raw = payload['filters']
+            if not isinstance(raw, dict) or not raw:
+                raise ValueError('filters must name at least one condition')
+            unknown = set(raw) - BULK_FILTER_KEYS
+            if unknown:
+                raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+            # A blank filter would otherwise be dropped and widen the update
+            blank = [name for name, value in raw.items() if value is None or not str(value).strip()]
+            if blank:
+                raise ValueError(f"Empty filters: {', '.join(sorted(blank))}")
+            # Same parsing as the roster's query string
+            filters = parse_student_filters({
+                name: str(value).lower() if isinstance(value, bool) else str(value)
+                for name, value in raw.items()
+            })
+            if all(value is None for value in filters.values()):
+                raise ValueError('filters must name at least one condition')
+        
+        if ids is None and filters is None:
+            raise ValueError('Give ids or filters')
+        
+        changed = db.set_students_approval(payload['approved'], user_ids=ids, filters=filters)
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Invalid request: {str(e)}'}), 400
+    
+    if changed is None:
+        return jsonify({'success': False, 'message': 'Failed to update approval status'}), 500
+    
+    return jsonify({'success': True, 'changed': changed})
+
 @admin_bp.route('/admin/student_details/<int:student_id>')
 def student_details(student_id):
     """Get detailed information about a student"""
@@ -117,6 +331,7 @@ def student_details(student_id):
     admin_user = db.get_user_by_id(user_id)
     student_detail = db.get_user_by_id(student_id)
     student_profile = db.get_student_profile(student_id)
+    student_projects = db.get_student_projects(student_id)
     
     if not student_detail or not student_profile:
         flash('Student not found', 'error')
@@ -126,46 +341,209 @@ def student_details(student_id):
                           user=admin_user,
                           student_detail=student_detail, 
                           student_profile=student_profile,
+                          student_projects=student_projects,
                           tab='student_detail',
                           role='admin')
 
+@admin_bp.route('/admin/import_students', methods=['POST'])
+def import_students():
+    """Bulk import students from a registrar CSV or XLSX file"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'Choose a CSV or XLSX file to import'}), 400
+    
+    import student_import
+    
+    try:
+        report = student_import.import_students(upload.stream, upload.filename)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.exception("Error importing students")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+    
+    report['success'] = True
+    return jsonify(report)
+
 @admin_bp.route('/admin/export_excel')
 def export_excel():
-    """Export eligible students to Excel file"""
+    """Export eligible students as XLSX (default), CSV, NDJSON or Parquet"""
     if 'user_id' not in session or session.get('role') != 'admin':
         return redirect(url_for('index'))
     
+    export_format = request.args.get('format', 'xlsx').lower()
+    if export_format not in exports.EXPORT_FORMATS:
+        flash(f'Unsupported export format: {export_format}', 'error')
+        return redirect(url_for('admin.dashboard'))
+    _, mimetype, stream, write = exports.EXPORT_FORMATS[export_format]
+    filename = exports.export_filename(export_format)
+    
+    # Exports are cached per data version and format
+    key = (db.get_export_version(), export_format)
+    etag = exports.export_etag(key)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    cache = exports.get_export_cache()
+    export_data = cache.open(key)
+    
+    if export_data is None and stream and db.count_students({'eligible': True}):
+        # Chunks are generated from the cursor while the response is sent
+        response = Response(
+            cache.tee(key, stream()),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        response.set_etag(etag)
+        return response
+    
     try:
-        # Get eligible students count for debugging
-        conn = db.get_db_connection()
-        if conn:
-            count = conn.execute("SELECT COUNT(*) FROM student_profiles WHERE is_eligible = 1").fetchone()[0]
-            conn.close()
-            print(f"Eligible student count before export: {count}")
-        
-        # Generate the Excel file
-        excel_data = db.export_eligible_students_to_excel()
+        # Generate the file
+        if export_data is None and write:
+            export_data = cache.build(key, write)
         
-        if not excel_data:
-            flash('No eligible students to export or error generating Excel file. Check server logs.', 'error')
+        if not export_data:
+            flash('No eligible students to export or error generating the export file. Check server logs.', 'error')
             return redirect(url_for('admin.dashboard'))
         
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f'eligible_students_{timestamp}.xlsx'
-        
-        print(f"Sending Excel file {filename} to client")
+        logger.info("Sending export", extra={'format': export_format, 'download_name': filename, 'etag': etag})
         
         return send_file(
-            excel_data,
+            export_data,
             as_attachment=True,
             download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            mimetype=mimetype,
+            etag=etag
         )
     except Exception as e:
-        print(f"Error in export_excel route: {str(e)}")
+        logger.exception("Error in export_excel route")
         flash(f'Error exporting data: {str(e)}', 'error')
         return redirect(url_for('admin.dashboard'))
 
+def export_job_payload(job):
+    """A job's progress plus the URLs to poll and download it"""
+    payload = job.to_dict()
+    payload['status_url'] = url_for('admin.export_job_status', job_id=job.id)
+    payload['download_url'] = url_for('admin.export_job_download', job_id=job.id) if job.status == 'done' else None
+    return payload
+
+@admin_bp.route('/admin/export_jobs', methods=['POST'])
+def start_export_job():
+    """Queue a background export of the eligible students"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    export_format = request.form.get('format', 'xlsx').lower()
+    if export_format not in exports.EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'Unsupported export format: {export_format}'}), 400
+    
+    try:
+        job = exports.get_export_jobs().submit(export_format)
+    except RuntimeError as e:
+        return jsonify({'success': False, 'message': str(e)}), 429
+    
+    return jsonify({'success': True, 'job': export_job_payload(job)}), 202
+
+@admin_bp.route('/admin/export_jobs/<job_id>')
+def export_job_status(job_id):
+    """Status and progress of a background export"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    job = exports.get_export_jobs().get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Export not found or expired'}), 404
+    
+    return jsonify({'success': True, 'job': export_job_payload(job)})
+
+@admin_bp.route('/admin/export_jobs/<job_id>/download')
+def export_job_download(job_id):
+    """Download the file of a finished background export"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return redirect(url_for('index'))
+    
+    jobs = exports.get_export_jobs()
+    job = jobs.get(job_id)
+    etag = exports.export_etag(job.key) if job else None
+    if job and request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    export_data = jobs.open(job) if job and job.status == 'done' else None
+    if not export_data:
+        flash('Export not found, not finished or expired', 'error')
+        return redirect(url_for('admin.dashboard'))
+    
+    return send_file(export_data, as_attachment=True, download_name=job.filename, mimetype=job.mimetype, etag=etag)
+
+@admin_bp.route('/admin/db_pool_stats')
+def db_pool_stats():
+    """Connection pool hit/miss and wait-time counters"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    return jsonify(db.get_pool_stats())
+
+@admin_bp.route('/admin/cache_stats')
+def cache_stats():
+    """Settings and export cache hit-rate counters"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    stats = db.get_cache_stats()
+    stats['exports'] = exports.get_export_cache().stats()
+    return jsonify(stats)
+
+@admin_bp.route('/admin/metrics')
+def request_metrics():
+    """Per-endpoint request latency in the Prometheus text format"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_bp.app_context_processor
+def sql_trace_flag():
+    """Lets templates link to the SQL trace page only while tracing is on"""
+    return {'sql_trace_enabled': sqltrace.SQL_TRACE}
+
+@admin_bp.route('/admin/sql_trace', methods=['GET', 'POST'])
+def sql_trace():
+    """Top queries by total time, per-endpoint query counts and slow queries
+    
+    Only available while SQL tracing is on (PLACEMENT_SQL_TRACE=1).
+    """
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return redirect(url_for('index'))
+    if not sqltrace.SQL_TRACE:
+        abort(404)
+    
+    trace = sqltrace.get_trace()
+    if request.method == 'POST':
+        trace.reset()
+        flash('SQL trace cleared', 'success')
+        return redirect(url_for('admin.sql_trace'))
+    
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in ('total_ms', 'calls', 'mean_ms', 'max_ms', 'rows', 'vm_steps'):
+        sort = 'total_ms'
+    
+    return render_template('dashboard.html',
+                          user=db.get_user_by_id(session['user_id']),
+                          queries=trace.top_queries(sort=sort),
+                          endpoints=trace.endpoint_summary(),
+                          slow_queries=trace.slow_queries(),
+                          slow_ms=trace.slow_ms,
+                          sort=sort,
+                          tab='sql_trace',
+                          role='admin')
+
 @admin_bp.route('/admin/settings', methods=['GET', 'POST'])
 def admin_settings():
     """Admin settings page"""
@@ -1,6 +1,8 @@
 from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
 import os
 import database as db
+import logs
+import metrics
 from student import student_bp
 from admin import admin_bp
 
@@ -12,6 +14,15 @@ app.secret_key = os.environ.get('SECRET_KEY', 'placement_tracker_secret_key')
 app.register_blueprint(student_bp)
 app.register_blueprint(admin_bp)
 
+# Hand out one pooled connection per request
+db.init_app(app)
+
+# Server-Timing headers and per-endpoint latency metrics
+metrics.init_app(app)
+
+# JSON logs written off the request threads, with request IDs
+logs.init_app(app)
+
 # Initialize database
 db.init_db()
 
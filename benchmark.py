@@ -0,0 +1,649 @@
+"""Performance benchmarks for the placement tracker database layer
+
+Each benchmark builds its own throwaway database, so the real
+placement_tracker.db is never touched.
+
+Usage:
+    python benchmark.py storage [--students N] [--writers N] [--readers N] [--seconds S]
+    python benchmark.py eligibility [--sizes N [N ...]] [--per-row-limit N]
+    python benchmark.py engine [--sizes N [N ...]] [--per-row-limit N] [--trials N]
+    python benchmark.py export [--rows N]
+    python benchmark.py formats [--rows N]
+    python benchmark.py startup [--runs N] [--budget S]
+    python benchmark.py login [--users N] [--threads N] [--seconds S]
+    python benchmark.py writes [--students N] [--threads N] [--saves N]
+    python benchmark.py profile [--students N] [--saves N] [--storage-profile NAME]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import database as db
+import eligibility
+import passwords
+
+DEPARTMENTS = ['CSE', 'ECE', 'MECH', 'CIVIL', 'IT']
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def make_database(path, students, profile=None, seed=42):
+    """Create a database at path and fill it with synthetic students"""
+    db.configure_pool(path=path, profile=profile)
+    db.init_db()
+
+    rng = random.Random(seed)
+    conn = db.get_db_connection()
+    try:
+        for i in range(students):
+            cur = conn.execute(
+                'INSERT INTO users (username, password, email, role, department, specialization) VALUES (?, ?, ?, ?, ?, ?)',
+                (f'student{i}', 'x', f'student{i}@example.com', 'student', rng.choice(DEPARTMENTS), 'General')
+            )
+            projects = ','.join(f'project {n}' for n in range(rng.randint(0, 5)))
+            conn.execute('''
+                INSERT INTO student_profiles
+                (user_id, semester_cgpa, domain_specialization, skills, projects, project_count, leetcode_problems,
+                portfolio_link, weekly_assessment_score, attendance_percentage)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                cur.lastrowid, round(rng.uniform(6.0, 10.0), 2), 'General', 'python,sql',
+                projects, db.count_projects(projects), rng.randint(0, 400),
+                'https://example.com' if rng.random() < 0.7 else '',
+                round(rng.uniform(50, 100), 2), round(rng.uniform(60, 100), 2)
+            ))
+        conn.commit()
+    finally:
+        db.release_db_connection(conn)
+
+def profile_form(rng):
+    """A random profile payload shaped like student.update_profile's"""
+    return {
+        'semester_cgpa': round(rng.uniform(6.0, 10.0), 2),
+        'domain_specialization': 'General',
+        'skills': 'python,sql',
+        'projects': ','.join(f'project {n}' for n in range(rng.randint(0, 5))),
+        'project_titles': '',
+        'project_domains': '',
+        'project_github_links': '',
+        'leetcode_problems': rng.randint(0, 400),
+        'leetcode_profile': '',
+        'github_profile': '',
+        'linkedin_profile': '',
+        'portfolio_link': 'https://example.com',
+        'weekly_assessment_score': round(rng.uniform(50, 100), 2),
+        'attendance_percentage': round(rng.uniform(60, 100), 2)
+    }
+
+def run_mixed_load(students, writers, readers, seconds):
+    """Run profile saves and page-view reads concurrently for a fixed time"""
+    stop = threading.Event()
+    results = {'write': [], 'read': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        latencies, errors = [], 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            if not db.update_student_profile(rng.randint(1, students), profile_form(rng)):
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            results['write'].extend(latencies)
+            results['errors'] += errors
+
+    def reader(seed):
+        rng = random.Random(seed)
+        latencies = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            user_id = rng.randint(1, students)
+            db.get_user_by_id(user_id)
+            db.get_student_profile(user_id)
+            db.get_eligibility_criteria()
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            results['read'].extend(latencies)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(1000 + i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return results
+
+def bench_storage(args):
+    """Compare the legacy and WAL storage profiles under concurrent reads and writes"""
+    print(f"{args.students} students, {args.writers} writers, {args.readers} readers, {args.seconds}s per profile")
+    print(f"{'profile':<8} {'writes/s':>10} {'reads/s':>10} {'write p95 ms':>13} {'read p95 ms':>12} {'errors':>7}")
+    for profile in ('legacy', 'wal'):
+        workdir = tempfile.mkdtemp(prefix='placement_bench_')
+        try:
+            make_database(os.path.join(workdir, 'bench.db'), args.students, profile=profile)
+            db.configure_pool(max_size=args.writers + args.readers)
+            results = run_mixed_load(args.students, args.writers, args.readers, args.seconds)
+            db.get_pool().close_all()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        print(f"{profile:<8} {len(results['write']) / args.seconds:>10.1f} "
+              f"{len(results['read']) / args.seconds:>10.1f} "
+              f"{percentile(results['write'], 95) * 1000:>13.2f} "
+              f"{percentile(results['read'], 95) * 1000:>12.2f} "
+              f"{results['errors']:>7}")
+
+def per_row_update_all_eligibility():
+    """The previous update_all_eligibility: one check_eligibility call per student"""
+    conn = db.get_db_connection()
+    try:
+        user_ids = [row['user_id'] for row in conn.execute('SELECT user_id FROM student_profiles')]
+    finally:
+        db.release_db_connection(conn)
+    for user_id in user_ids:
+        db.check_eligibility(user_id)
+
+def eligibility_snapshot():
+    conn = db.get_db_connection()
+    try:
+        return conn.execute(
+            'SELECT user_id, is_eligible, failed_criteria FROM student_profiles ORDER BY user_id'
+        ).fetchall()
+    finally:
+        db.release_db_connection(conn)
+
+def reset_eligibility():
+    """Clear every stored result so each recomputation does the same work"""
+    conn = db.get_db_connection()
+    conn.execute('UPDATE student_profiles SET is_eligible = 0, failed_criteria = NULL')
+    conn.commit()
+    db.release_db_connection(conn)
+
+def bench_eligibility(args):
+    """Time the per-row and set-based cohort eligibility recomputation"""
+    print(f"{'students':>9} {'per-row s':>10} {'set-based s':>12} {'changed':>8} {'speedup':>8}")
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='placement_bench_')
+        try:
+            make_database(os.path.join(workdir, 'bench.db'), size)
+
+            per_row = None
+            if size <= args.per_row_limit:
+                reset_eligibility()
+                start = time.perf_counter()
+                per_row_update_all_eligibility()
+                per_row = time.perf_counter() - start
+                expected = [tuple(row) for row in eligibility_snapshot()]
+
+            # Reset and recompute so the set-based run has the same work to do
+            reset_eligibility()
+            start = time.perf_counter()
+            changed = db.update_all_eligibility()
+            set_based = time.perf_counter() - start
+
+            if per_row is not None:
+                assert [tuple(row) for row in eligibility_snapshot()] == expected, 'results differ'
+            db.get_pool().close_all()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        per_row_text = f"{per_row:.3f}" if per_row is not None else 'skipped'
+        speedup = f"{per_row / set_based:.0f}x" if per_row is not None else '-'
+        print(f"{size:>9} {per_row_text:>10} {set_based:>12.3f} {changed:>8} {speedup:>8}")
+
+def random_criteria(rng):
+    return {
+        'min_attendance': rng.uniform(60, 100),
+        'min_assessment_score': rng.uniform(50, 100),
+        'min_cgpa': rng.uniform(6.0, 10.0),
+        'min_leetcode_problems': rng.randint(0, 400),
+        'min_projects': rng.randint(0, 5),
+        'require_portfolio': rng.randint(0, 1),
+        'require_leetcode_profile': rng.randint(0, 1),
+        'require_github_profile': rng.randint(0, 1),
+        'require_linkedin_profile': rng.randint(0, 1)
+    }
+
+def bench_engine(args):
+    """Compare the NumPy eligibility engine with the per-row and SQL paths"""
+    rng = random.Random(7)
+    print(f"{'students':>9} {'per-row s':>10} {'sql s':>8} {'numpy s':>8} {'evaluate ms':>12} {'changed':>8}")
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix='placement_bench_')
+        try:
+            make_database(os.path.join(workdir, 'bench.db'), size)
+
+            # The engine must agree with the scalar rules for any criteria
+            conn = db.get_db_connection()
+            profiles = [dict(row) for row in conn.execute('SELECT * FROM student_profiles ORDER BY user_id')]
+            metrics = eligibility.CohortMetrics.load(conn)
+            db.release_db_connection(conn)
+            for _ in range(args.trials):
+                criteria = random_criteria(rng)
+                expected = [db.is_profile_eligible(profile, criteria) for profile in profiles]
+                assert metrics.evaluate(criteria).tolist() == expected, 'engine disagrees with scalar rules'
+                expected = [db.failed_criteria(profile, criteria) for profile in profiles]
+                assert metrics.failures(criteria).tolist() == expected, 'engine failures disagree with scalar rules'
+
+            per_row = None
+            if size <= args.per_row_limit:
+                reset_eligibility()
+                start = time.perf_counter()
+                per_row_update_all_eligibility()
+                per_row = time.perf_counter() - start
+                expected = [tuple(row) for row in eligibility_snapshot()]
+
+            reset_eligibility()
+            start = time.perf_counter()
+            db.update_all_eligibility()
+            sql = time.perf_counter() - start
+            sql_result = [tuple(row) for row in eligibility_snapshot()]
+
+            reset_eligibility()
+            start = time.perf_counter()
+            changed = eligibility.recompute_eligibility()
+            vectorized = time.perf_counter() - start
+            assert [tuple(row) for row in eligibility_snapshot()] == sql_result, 'engine disagrees with SQL'
+            if per_row is not None:
+                assert sql_result == expected, 'engine disagrees with per-row path'
+
+            start = time.perf_counter()
+            metrics.evaluate(random_criteria(rng))
+            evaluate = time.perf_counter() - start
+            db.get_pool().close_all()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        per_row_text = f"{per_row:.3f}" if per_row is not None else 'skipped'
+        print(f"{size:>9} {per_row_text:>10} {sql:>8.3f} {vectorized:>8.3f} {evaluate * 1000:>12.2f} {changed:>8}")
+
+def pandas_export():
+    """The previous Excel export: fetchall, list of dicts, DataFrame, BytesIO"""
+    import io
+    import pandas as pd
+
+    conn = db.get_db_connection()
+    try:
+        students = conn.execute(db.EXPORT_QUERY).fetchall()
+    finally:
+        db.release_db_connection(conn)
+    students_list = [
+        {header: convert(dict(student)[column]) if convert else dict(student)[column]
+         for header, column, convert in db.EXPORT_COLUMNS}
+        for student in students
+    ]
+    df = pd.DataFrame(students_list)
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='Eligible Students', index=False)
+        worksheet = writer.sheets['Eligible Students']
+        for i, col in enumerate(df.columns):
+            max_len = max(df[col].astype(str).map(len).max(), len(col)) + 2
+            worksheet.set_column(i, i, max_len)
+    output.seek(0)
+    return output
+
+def measure(func):
+    """Run func and return (result, seconds, peak traced MiB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def file_size(output):
+    output.seek(0, os.SEEK_END)
+    size = output.tell()
+    output.close()
+    return size
+
+def bench_export(args):
+    """Compare the pandas and streaming Excel exports by time and peak memory"""
+    workdir = tempfile.mkdtemp(prefix='placement_bench_')
+    try:
+        make_database(os.path.join(workdir, 'bench.db'), args.rows)
+        conn = db.get_db_connection()
+        conn.execute('UPDATE student_profiles SET is_eligible = 1')
+        conn.commit()
+        db.release_db_connection(conn)
+
+        # Import pandas up front so its import cost isn't counted
+        import pandas  # noqa: F401
+
+        print(f"{args.rows} eligible students")
+        print(f"{'export':<10} {'seconds':>8} {'peak MiB':>9} {'size KiB':>9}")
+        for name, func in (('pandas', pandas_export), ('streaming', db.export_eligible_students_to_excel)):
+            output, elapsed, peak = measure(func)
+            print(f"{name:<10} {elapsed:>8.2f} {peak:>9.1f} {file_size(output) / 1024:>9.0f}")
+        db.get_pool().close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def stream_size(chunks):
+    return sum(len(chunk.encode()) for chunk in chunks)
+
+def bench_formats(args):
+    """Compare export throughput across XLSX, Parquet, CSV and NDJSON"""
+    workdir = tempfile.mkdtemp(prefix='placement_bench_')
+    try:
+        make_database(os.path.join(workdir, 'bench.db'), args.rows)
+        conn = db.get_db_connection()
+        conn.execute('UPDATE student_profiles SET is_eligible = 1')
+        conn.commit()
+        db.release_db_connection(conn)
+
+        formats = [
+            ('xlsx', lambda: file_size(db.export_eligible_students_to_excel())),
+            ('parquet', lambda: file_size(db.export_eligible_students_to_parquet())),
+            ('csv', lambda: stream_size(db.iter_export_csv())),
+            ('ndjson', lambda: stream_size(db.iter_export_ndjson())),
+        ]
+        print(f"{args.rows} eligible students")
+        print(f"{'format':<8} {'seconds':>8} {'rows/s':>9} {'size KiB':>9}")
+        for name, func in formats:
+            start = time.perf_counter()
+            size = func()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8} {elapsed:>8.2f} {args.rows / elapsed:>9.0f} {size / 1024:>9.0f}")
+        db.get_pool().close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# Run in a fresh interpreter: import the app and serve its first request
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import': imported - start, 'first_response': time.perf_counter() - imported}))
+"""
+
+def measure_startup(path):
+    """Cold-start the app in a new interpreter and return its timings in seconds"""
+    env = dict(os.environ, PLACEMENT_DB=path)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', STARTUP_SCRIPT],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+def bench_startup(args):
+    """Time cold import-to-first-response of app.py against a startup budget"""
+    workdir = tempfile.mkdtemp(prefix='placement_bench_')
+    try:
+        path = os.path.join(workdir, 'bench.db')
+        fresh = measure_startup(path)
+        runs = [measure_startup(path) for _ in range(args.runs)]
+
+        print(f"{'run':<10} {'import':>8} {'first req':>10} {'total':>8}")
+        print(f"{'fresh db':<10} {fresh['import']:>8.3f} {fresh['first_response']:>10.3f} {fresh['total']:>8.3f}")
+        median = {name: percentile([run[name] for run in runs], 50) for name in ('import', 'first_response', 'total')}
+        print(f"{'median':<10} {median['import']:>8.3f} {median['first_response']:>10.3f} {median['total']:>8.3f}")
+
+        if median['total'] > args.budget:
+            print(f"Startup budget exceeded: {median['total']:.3f}s > {args.budget:.3f}s")
+            sys.exit(1)
+        print(f"Within the {args.budget:.3f}s startup budget")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def bench_login(args):
+    """Measure login throughput with hashing inline and on the process pool"""
+    workdir = tempfile.mkdtemp(prefix='placement_bench_')
+    cores = os.cpu_count() or 1
+    try:
+        make_database(os.path.join(workdir, 'bench.db'), args.users)
+        hashes = passwords.hash_passwords(['password'] * args.users)
+        conn = db.get_db_connection()
+        conn.executemany('UPDATE users SET password = ? WHERE username = ?',
+                         [(hashed, f'student{i}') for i, hashed in enumerate(hashes)])
+        conn.commit()
+        db.release_db_connection(conn)
+
+        print(f"{args.users} users, {args.threads} threads, {args.seconds}s per mode, "
+              f"{cores} cores, {passwords.get_hasher().method}")
+        print(f"{'mode':<8} {'logins/s':>9} {'per core':>9} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}")
+        for mode, workers in (('inline', 0), ('pool', cores)):
+            passwords.configure(workers=workers)
+            stop = threading.Event()
+            latencies, failures = [], []
+            lock = threading.Lock()
+
+            def login(seed):
+                rng = random.Random(seed)
+                mine, failed = [], 0
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    if not db.authenticate_user(f'student{rng.randrange(args.users)}', 'password'):
+                        failed += 1
+                    mine.append(time.perf_counter() - start)
+                with lock:
+                    latencies.extend(mine)
+                    failures.append(failed)
+
+            # Start the pool's workers before timing
+            passwords.check_password(hashes[0], 'password')
+            threads = [threading.Thread(target=login, args=(i,)) for i in range(args.threads)]
+            for t in threads:
+                t.start()
+            time.sleep(args.seconds)
+            stop.set()
+            for t in threads:
+                t.join()
+
+            rate = len(latencies) / args.seconds
+            print(f"{mode:<8} {rate:>9.1f} {rate / cores:>9.1f} {percentile(latencies, 50) * 1000:>8.1f} "
+                  f"{percentile(latencies, 95) * 1000:>8.1f} {sum(failures):>7}")
+        db.get_pool().close_all()
+    finally:
+        passwords.configure(workers=passwords.PASSWORD_WORKERS)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def two_transaction_profile_save(user_id, data):
+    """The previous update_student_profile: read, update or insert and commit,
+    then check_eligibility on a second connection and commit again"""
+    conn = db.get_db_connection()
+    try:
+        profile = conn.execute('SELECT * FROM student_profiles WHERE user_id = ?', (user_id,)).fetchone()
+        values = [data[column] for column in db.PROFILE_FORM_COLUMNS] + [
+            db.count_projects(data['projects'], data['project_titles'], data['project_domains'],
+                              data['project_github_links'])
+        ]
+        if profile:
+            conn.execute(f"""
+                UPDATE student_profiles SET {', '.join(f'{column} = ?' for column in db.PROFILE_FORM_COLUMNS)},
+                project_count = ? WHERE user_id = ?
+            """, values + [user_id])
+        else:
+            conn.execute(f"""
+                INSERT INTO student_profiles (user_id, {', '.join(db.PROFILE_FORM_COLUMNS)}, project_count)
+                VALUES ({', '.join('?' * (len(values) + 1))})
+            """, [user_id] + values)
+        conn.execute('DELETE FROM student_projects WHERE user_id = ?', (user_id,))
+        conn.executemany('''
+            INSERT INTO student_projects (user_id, position, description, title, domain, github_link)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (user_id, project['position'], project['description'], project['title'],
+             project['domain'], project['github_link'])
+            for project in db.split_projects(data['projects'], data['project_titles'],
+                                             data['project_domains'], data['project_github_links'])
+        ])
+        db.bump_data_version(conn, 'students')
+        conn.commit()
+        return db.check_eligibility(user_id)
+    finally:
+        db.release_db_connection(conn)
+
+def bench_profile(args):
+    """Time single profile saves, two transactions vs the one-statement upsert"""
+    rng = random.Random(11)
+    # About half the saves create a profile, the rest update one
+    saves = [(rng.randint(1, 2 * args.students), profile_form(rng)) for _ in range(args.saves)]
+    print(f"{args.students} profiles, {args.saves} sequential profile saves per path, "
+          f"{args.storage_profile} storage profile")
+    print(f"{'path':<7} {'saves/s':>9} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for path, save in (('before', two_transaction_profile_save), ('after', db.update_student_profile)):
+        workdir = tempfile.mkdtemp(prefix='placement_bench_')
+        try:
+            make_database(os.path.join(workdir, 'bench.db'), 2 * args.students, profile=args.storage_profile)
+            conn = db.get_db_connection()
+            conn.execute('DELETE FROM student_profiles WHERE user_id > ?', (args.students,))
+            conn.commit()
+            db.release_db_connection(conn)
+            db.update_all_eligibility()
+
+            latencies = []
+            for user_id, form in saves:
+                start = time.perf_counter()
+                save(user_id, form)
+                latencies.append(time.perf_counter() - start)
+
+            # Every save must leave the eligibility a full recomputation would
+            assert db.update_all_eligibility() == 0, 'eligibility differs from the SQL rules'
+            db.get_pool().close_all()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        total = sum(latencies)
+        print(f"{path:<7} {len(latencies) / total:>9.1f} {total / len(latencies) * 1000:>8.3f} "
+              f"{percentile(latencies, 50) * 1000:>8.3f} {percentile(latencies, 95) * 1000:>8.3f} "
+              f"{percentile(latencies, 99) * 1000:>8.3f}")
+
+def bench_writes(args):
+    """Stress concurrent profile saves, each on its own connection vs the write queue"""
+    total = args.threads * args.saves
+    print(f"{args.students} students, {args.threads} threads x {args.saves} profile saves per mode")
+    print(f"{'mode':<8} {'saves/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>7} {'mean batch':>11}")
+    for mode, queued in (('direct', False), ('queue', True)):
+        workdir = tempfile.mkdtemp(prefix='placement_bench_')
+        try:
+            make_database(os.path.join(workdir, 'bench.db'), args.students)
+            # Every thread holds its own connection, so direct writers contend for SQLite's lock
+            db.configure_pool(max_size=args.threads)
+            db.DB_WRITE_QUEUE = queued
+            latencies, failures = [], []
+            lock = threading.Lock()
+            ready = threading.Barrier(args.threads + 1)
+
+            def save(seed):
+                rng = random.Random(seed)
+                forms = [(rng.randint(1, args.students), profile_form(rng)) for _ in range(args.saves)]
+                mine, failed = [], 0
+                ready.wait()
+                for user_id, form in forms:
+                    start = time.perf_counter()
+                    if not db.update_student_profile(user_id, form):
+                        failed += 1
+                    mine.append(time.perf_counter() - start)
+                with lock:
+                    latencies.extend(mine)
+                    failures.append(failed)
+
+            threads = [threading.Thread(target=save, args=(i,)) for i in range(args.threads)]
+            for t in threads:
+                t.start()
+            ready.wait()
+            start = time.perf_counter()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+
+            mean_batch = db.get_writer().stats()['mean_batch'] if queued else 1.0
+            db.close_writer()
+            db.get_pool().close_all()
+        finally:
+            db.DB_WRITE_QUEUE = False
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        print(f"{mode:<8} {total / elapsed:>9.1f} {percentile(latencies, 50) * 1000:>8.1f} "
+              f"{percentile(latencies, 95) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+              f"{sum(failures):>7} {mean_batch:>11.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    storage = subparsers.add_parser('storage', help=bench_storage.__doc__)
+    storage.add_argument('--students', type=int, default=2000)
+    storage.add_argument('--writers', type=int, default=8)
+    storage.add_argument('--readers', type=int, default=8)
+    storage.add_argument('--seconds', type=float, default=5.0)
+    storage.set_defaults(func=bench_storage)
+
+    eligibility = subparsers.add_parser('eligibility', help=bench_eligibility.__doc__)
+    eligibility.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    eligibility.add_argument('--per-row-limit', type=int, default=10000,
+                             help='skip the per-row path above this many students')
+    eligibility.set_defaults(func=bench_eligibility)
+
+    engine = subparsers.add_parser('engine', help=bench_engine.__doc__)
+    engine.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    engine.add_argument('--per-row-limit', type=int, default=10000,
+                        help='skip the per-row path above this many students')
+    engine.add_argument('--trials', type=int, default=20,
+                        help='random criteria sets checked against the scalar rules')
+    engine.set_defaults(func=bench_engine)
+
+    export = subparsers.add_parser('export', help=bench_export.__doc__)
+    export.add_argument('--rows', type=int, default=50000)
+    export.set_defaults(func=bench_export)
+
+    formats = subparsers.add_parser('formats', help=bench_formats.__doc__)
+    formats.add_argument('--rows', type=int, default=50000)
+    formats.set_defaults(func=bench_formats)
+
+    startup = subparsers.add_parser('startup', help=bench_startup.__doc__)
+    startup.add_argument('--runs', type=int, default=5)
+    startup.add_argument('--budget', type=float, default=0.6,
+                         help='maximum median seconds from interpreter start to first response')
+    startup.set_defaults(func=bench_startup)
+
+    login = subparsers.add_parser('login', help=bench_login.__doc__)
+    login.add_argument('--users', type=int, default=200)
+    login.add_argument('--threads', type=int, default=2 * (os.cpu_count() or 1))
+    login.add_argument('--seconds', type=float, default=5.0)
+    login.set_defaults(func=bench_login)
+
+    writes = subparsers.add_parser('writes', help=bench_writes.__doc__)
+    writes.add_argument('--students', type=int, default=2000)
+    writes.add_argument('--threads', type=int, default=200)
+    writes.add_argument('--saves', type=int, default=20, help='profile saves per thread')
+    writes.set_defaults(func=bench_writes)
+
+    profile = subparsers.add_parser('profile', help=bench_profile.__doc__)
+    profile.add_argument('--students', type=int, default=5000)
+    profile.add_argument('--saves', type=int, default=5000)
+    profile.add_argument('--storage-profile', default='wal', choices=sorted(db.STORAGE_PROFILES),
+                         help='legacy syncs to disk on every commit')
+    profile.set_defaults(func=bench_profile)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,499 @@
+"""Regression benchmark suite over synthetic cohorts
+
+Times every public function in database.py and every Flask route (through
+the test client) against cohorts made by cohort.py, and saves the results
+as JSON so runs can be compared. Each cohort size runs in its own
+interpreter, so caches and pools never leak from one size into the next.
+
+Usage:
+    python benchmark_suite.py run [--sizes N [N ...]] [--runs N] [--budget S] [--output FILE]
+    python benchmark_suite.py compare BASELINE CURRENT [--threshold F] [--min-ms MS]
+
+Sizes accept suffixes, e.g. 1k, 10k, 100k or 1m.
+"""
+import argparse
+import datetime
+import inspect
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+import database as db
+import passwords
+from benchmark import percentile, profile_form
+from cohort import PASSWORD, generate_cohort, parse_size
+
+ADMIN_USERNAME = 'bench_admin'
+
+def drain(chunks):
+    """Consume an iterator, returning how many items it yielded"""
+    return sum(1 for _ in chunks)
+
+def with_connection(func):
+    """Call func with a pooled connection"""
+    conn = db.get_db_connection()
+    try:
+        return func(conn)
+    finally:
+        db.release_db_connection(conn)
+
+def bump_students():
+    """Move the students version so the next export misses the export cache"""
+    def bump(conn):
+        db.bump_data_version(conn, 'students')
+        conn.commit()
+    with_connection(bump)
+
+def bump_benchmark_version(conn):
+    """A minimal transaction body for the write helpers"""
+    db.bump_data_version(conn, 'benchmark')
+
+def start_writer(ctx):
+    """Setup for close_writer: make sure there is a writer to stop"""
+    db.get_writer()
+    return ()
+
+class Context:
+    """State shared by the cases of one cohort: sample ids and unique names"""
+
+    def __init__(self, path, size, app):
+        self.path = path
+        self.size = size
+        self.app = app
+        self.counter = 0
+        conn = db.get_db_connection()
+        try:
+            # A student with a profile and projects, near the middle of the cohort
+            row = conn.execute('''
+                SELECT u.id, u.username, u.email FROM users u
+                JOIN student_profiles sp ON sp.user_id = u.id
+                WHERE u.role = 'student' AND sp.project_count > 0 AND u.id >= ?
+                ORDER BY u.id LIMIT 1
+            ''', (size // 2,)).fetchone()
+            self.student_id, self.username, self.email = row['id'], row['username'], row['email']
+            self.profile = dict(conn.execute(
+                'SELECT * FROM student_profiles WHERE user_id = ?', (self.student_id,)
+            ).fetchone())
+            self.sample_ids = [r[0] for r in conn.execute(
+                "SELECT id FROM users WHERE role = 'student' ORDER BY id LIMIT 100 OFFSET ?", (size // 3,)
+            ).fetchall()]
+        finally:
+            db.release_db_connection(conn)
+        self.criteria = db.get_eligibility_criteria()
+        self.password_hash = passwords.get_hasher().hash(PASSWORD)
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f'{prefix}{self.counter}'
+
+    def toggle(self):
+        """Alternate True and False, so approval cases always change something"""
+        self.counter += 1
+        return self.counter % 2 == 0
+
+    def signup(self):
+        """Username and email for a user that doesn't exist yet"""
+        username = self.unique('signup')
+        return username, f'{username}@example.com'
+
+    def new_students(self, count=100):
+        """Import-shaped dicts for students that don't exist yet"""
+        batch = self.unique('batch')
+        return [
+            dict(profile_form(random.Random(i)), username=f'{batch}_{i}',
+                 email=f'{batch}_{i}@example.com', department='CSE', specialization='AI',
+                 password=self.password_hash)
+            for i in range(count)
+        ]
+
+    def client(self, username=None):
+        """A test client, logged in as username if given"""
+        client = self.app.test_client()
+        if username:
+            response = client.post('/login', data={'username': username, 'password': PASSWORD})
+            assert response.status_code == 302, response.status_code
+        return client
+
+# database.py cases: (function name, call, setup). setup(ctx) returns the
+# call's arguments and is not timed.
+DATABASE_CASES = [
+    ('get_storage_profile', db.get_storage_profile, None),
+    ('apply_storage_profile', lambda: with_connection(db.apply_storage_profile), None),
+    ('split_projects', db.split_projects,
+     lambda c: (c.profile['projects'], c.profile['project_titles'], c.profile['project_domains'],
+                c.profile['project_github_links'])),
+    ('count_projects', db.count_projects,
+     lambda c: (c.profile['projects'], c.profile['project_titles'], c.profile['project_domains'],
+                c.profile['project_github_links'])),
+    ('migrate_schema', lambda: with_connection(lambda conn: db.migrate_schema(conn.cursor())), None),
+    ('init_db', db.init_db, None),
+    ('get_pool', db.get_pool, None),
+    ('configure_pool', db.configure_pool, lambda c: (c.path,)),
+    ('get_pool_stats', db.get_pool_stats, None),
+    ('get_writer', db.get_writer, None),
+    ('close_writer', db.close_writer, start_writer),
+    ('submit_write', lambda body: db.submit_write(body).result(), lambda c: (bump_benchmark_version,)),
+    ('run_write', db.run_write, lambda c: (bump_benchmark_version,)),
+    ('get_db_connection', lambda: db.release_db_connection(db.get_db_connection()), None),
+    ('release_db_connection', db.release_db_connection, lambda c: (db.get_db_connection(),)),
+    # Popping the app context runs close_db as its teardown
+    ('close_db', lambda context: context.pop(), lambda c: (_pushed_context_with_connection(c.app),)),
+    ('init_app', lambda: db.init_app(Flask(__name__)), None),
+    ('get_cache_stats', db.get_cache_stats, None),
+    ('bump_data_version', lambda: with_connection(
+        lambda conn: (db.bump_data_version(conn, 'benchmark'), conn.commit())), None),
+    ('get_export_version', db.get_export_version, None),
+    ('register_user', db.register_user,
+     lambda c: (lambda username, email: (username, PASSWORD, email, 'student', 'CSE', 'AI'))(*c.signup())),
+    ('authenticate_user', db.authenticate_user, lambda c: (c.username, PASSWORD)),
+    ('get_user_by_id', db.get_user_by_id, lambda c: (c.student_id,)),
+    ('update_student_profile', db.update_student_profile,
+     lambda c: (c.student_id, profile_form(random.Random(c.unique(''))))),
+    ('find_users', db.find_users, lambda c: ([c.username, 'nobody'], [c.email, 'nobody@example.com'])),
+    ('import_student_batch', db.import_student_batch,
+     lambda c: (c.new_students(), ['semester_cgpa', 'leetcode_problems', 'weekly_assessment_score',
+                                   'attendance_percentage', 'projects', 'portfolio_link'])),
+    ('get_student_profile', db.get_student_profile, lambda c: (c.student_id,)),
+    ('get_student_projects', db.get_student_projects, lambda c: (c.student_id,)),
+    ('get_students_by_project_domain', db.get_students_by_project_domain, lambda c: ('ML',)),
+    ('get_all_students_by_department', db.get_all_students_by_department, lambda c: ('CSE',)),
+    ('get_all_students', db.get_all_students, None),
+    ('get_eligible_students', db.get_eligible_students, None),
+    ('student_page_queries', db.student_page_queries, lambda c: ({'department': 'CSE'}, None, 'cgpa', True)),
+    ('get_students_page', db.get_students_page, lambda c: ({'department': 'CSE', 'min_cgpa': 8.0},)),
+    ('count_students', db.count_students, lambda c: ({'eligible': True},)),
+    ('get_eligibility_criteria', db.get_eligibility_criteria, None),
+    ('update_eligibility_criteria', db.update_eligibility_criteria, lambda c: (dict(c.criteria),)),
+    ('update_all_eligibility', db.update_all_eligibility, None),
+    ('failed_criteria', db.failed_criteria, lambda c: (c.profile, c.criteria)),
+    ('is_profile_eligible', db.is_profile_eligible, lambda c: (c.profile, c.criteria)),
+    ('check_eligibility', db.check_eligibility, lambda c: (c.student_id,)),
+    ('get_eligibility_failures', db.get_eligibility_failures, None),
+    ('get_near_miss_students', db.get_near_miss_students, None),
+    ('approve_student', db.approve_student, lambda c: (c.student_id, c.toggle())),
+    ('approval_update_sql', db.approval_update_sql, lambda c: (True, c.sample_ids, {'department': 'CSE'})),
+    ('set_students_approval', db.set_students_approval, lambda c: (c.toggle(), c.sample_ids)),
+    ('get_admin_key', db.get_admin_key, None),
+    ('update_admin_key', db.update_admin_key, lambda c: ('admin123',)),
+    ('iter_export_rows', lambda: with_connection(lambda conn: drain(db.iter_export_rows(conn))), None),
+    ('iter_export_batches', lambda: drain(db.iter_export_batches()), None),
+    ('iter_export_csv', lambda: drain(db.iter_export_csv()), None),
+    ('iter_export_ndjson', lambda: drain(db.iter_export_ndjson()), None),
+    ('write_parquet_export', db.write_parquet_export, lambda c: (io.BytesIO(),)),
+    ('write_excel_export', db.write_excel_export, lambda c: (io.BytesIO(),)),
+    ('export_eligible_students_to_parquet', lambda: _close(db.export_eligible_students_to_parquet()), None),
+    ('export_eligible_students_to_excel', lambda: _close(db.export_eligible_students_to_excel()), None),
+]
+
+def _pushed_context_with_connection(app):
+    """An app context holding a request-scoped connection, for timing close_db on teardown"""
+    context = app.app_context()
+    context.push()
+    db.get_db_connection()
+    return context
+
+def _close(output):
+    if output is not None:
+        output.close()
+
+def import_csv(ctx, count=20):
+    """A registrar CSV of students that don't exist yet"""
+    lines = ['username,email,department,password,semester_cgpa,attendance_percentage']
+    batch = ctx.unique('import')
+    lines += [f'{batch}_{i},{batch}_{i}@example.com,CSE,{PASSWORD},8.{i % 10},9{i % 10}' for i in range(count)]
+    return io.BytesIO('\n'.join(lines).encode())
+
+def finished_job(ctx, client):
+    """Id of an export job that has finished"""
+    job_id = client.post('/admin/export_jobs', data={'format': 'csv'}).get_json()['job']['id']
+    while client.get(f'/admin/export_jobs/{job_id}').get_json()['job']['status'] in ('queued', 'running'):
+        time.sleep(0.01)
+    return job_id
+
+# Route cases: (method, rule, client, request). client is None, 'student' or
+# 'admin'; request(ctx, client) returns (url, test client keyword arguments)
+# and is not timed.
+ROUTE_CASES = [
+    ('GET', '/static/<path:filename>', None, lambda c, t: ('/static/styles.css', {})),
+    ('GET', '/', None, lambda c, t: ('/', {})),
+    ('POST', '/login', None, lambda c, t: ('/login', {'data': {'username': c.username, 'password': PASSWORD}})),
+    ('GET', '/logout', 'student', lambda c, t: ('/logout', {})),
+    ('GET', '/register', None, lambda c, t: ('/register', {})),
+    ('POST', '/register', None, lambda c, t: ('/register', {'data': dict(
+        zip(('username', 'email'), c.signup()), password=PASSWORD, role='student', department='CSE',
+        specialization='AI')})),
+    ('GET', '/student/dashboard', 'student', lambda c, t: ('/student/dashboard', {})),
+    ('POST', '/student/update_profile', 'student', lambda c, t: (
+        '/student/update_profile', {'data': profile_form(random.Random(c.unique('')))})),
+    ('GET', '/student/profile', 'student', lambda c, t: ('/student/profile', {})),
+    ('GET', '/admin/dashboard', 'admin', lambda c, t: ('/admin/dashboard', {})),
+    ('GET', '/admin/api/students', 'admin', lambda c, t: ('/admin/api/students?department=CSE&sort=cgpa&order=desc', {})),
+    ('GET', '/admin/students_by_department/<department>', 'admin',
+     lambda c, t: ('/admin/students_by_department/CSE', {})),
+    ('GET', '/admin/students_by_project_domain/<domain>', 'admin',
+     lambda c, t: ('/admin/students_by_project_domain/ML', {})),
+    ('GET', '/admin/eligibility_criteria', 'admin', lambda c, t: ('/admin/eligibility_criteria', {})),
+    ('POST', '/admin/eligibility_criteria', 'admin', lambda c, t: ('/admin/eligibility_criteria', {'data': {
+        key: value for key, value in c.criteria.items() if key != 'id' and value}})),
+    ('GET', '/admin/eligibility_preview', 'admin', lambda c, t: ('/admin/eligibility_preview?min_cgpa=8.0', {})),
+    ('GET', '/admin/eligibility_failures', 'admin', lambda c, t: ('/admin/eligibility_failures', {})),
+    ('GET', '/admin/near_miss_students', 'admin', lambda c, t: ('/admin/near_miss_students?criterion=projects', {})),
+    ('POST', '/admin/approve_student/<int:student_id>', 'admin',
+     lambda c, t: (f'/admin/approve_student/{c.student_id}', {'data': {'approved': 'true'}})),
+    ('POST', '/admin/approve_students', 'admin', lambda c, t: (
+        '/admin/approve_students', {'json': {'approved': c.toggle(), 'ids': c.sample_ids}})),
+    ('GET', '/admin/student_details/<int:student_id>', 'admin',
+     lambda c, t: (f'/admin/student_details/{c.student_id}', {})),
+    ('POST', '/admin/import_students', 'admin', lambda c, t: (
+        '/admin/import_students', {'data': {'file': (import_csv(c), 'students.csv')}})),
+    ('GET', '/admin/export_excel', 'admin', lambda c, t: (bump_students(), ('/admin/export_excel?format=csv', {}))[1]),
+    ('POST', '/admin/export_jobs', 'admin', lambda c, t: (bump_students(), ('/admin/export_jobs', {'data': {'format': 'csv'}}))[1]),
+    ('GET', '/admin/export_jobs/<job_id>', 'admin', lambda c, t: (f'/admin/export_jobs/{finished_job(c, t)}', {})),
+    ('GET', '/admin/export_jobs/<job_id>/download', 'admin',
+     lambda c, t: (f'/admin/export_jobs/{finished_job(c, t)}/download', {})),
+    ('GET', '/admin/db_pool_stats', 'admin', lambda c, t: ('/admin/db_pool_stats', {})),
+    ('GET', '/admin/cache_stats', 'admin', lambda c, t: ('/admin/cache_stats', {})),
+    ('GET', '/admin/metrics', 'admin', lambda c, t: ('/admin/metrics', {})),
+    ('GET', '/admin/sql_trace', 'admin', lambda c, t: ('/admin/sql_trace', {})),
+    ('POST', '/admin/sql_trace', 'admin', lambda c, t: ('/admin/sql_trace', {})),
+    ('GET', '/admin/settings', 'admin', lambda c, t: ('/admin/settings', {})),
+    ('POST', '/admin/settings', 'admin', lambda c, t: ('/admin/settings', {'data': {'admin_key': 'admin123'}})),
+]
+
+# Export formats are timed separately since each has its own writer
+EXPORT_ROUTE_FORMATS = ['xlsx', 'parquet', 'csv', 'ndjson']
+
+def summarize(timings):
+    """Stats of a list of durations in seconds, in milliseconds"""
+    return {
+        'runs': len(timings),
+        'median_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+    }
+
+def time_case(call, setup, runs, budget):
+    """Time call(*setup()) up to runs times, stopping early once budget seconds are spent
+
+    One untimed warm-up call comes first; at least one call is timed.
+    """
+    call(*setup())
+    timings = []
+    spent = 0.0
+    while len(timings) < runs and (not timings or spent < budget):
+        args = setup()
+        start = time.perf_counter()
+        call(*args)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        spent += elapsed
+    return summarize(timings)
+
+def uncovered_functions():
+    """Public database.py functions without a case"""
+    covered = {name for name, _, _ in DATABASE_CASES}
+    return sorted(
+        name for name, func in inspect.getmembers(db, inspect.isfunction)
+        if func.__module__ == db.__name__ and not name.startswith('_') and name not in covered
+    )
+
+def uncovered_routes(app):
+    """(method, rule) pairs of the app without a case"""
+    covered = {(method, rule) for method, rule, _, _ in ROUTE_CASES}
+    return sorted(
+        (method, rule.rule) for rule in app.url_map.iter_rules()
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+        if (method, rule.rule) not in covered
+    )
+
+def bench_size(size, runs, budget, seed):
+    """Generate one cohort and time every case against it; returns the results dict"""
+    workdir = tempfile.mkdtemp(prefix='placement_suite_')
+    try:
+        path = os.path.join(workdir, 'cohort.db')
+        start = time.perf_counter()
+        generate_cohort(path, size, seed=seed)
+        generated = time.perf_counter() - start
+        db.register_user(ADMIN_USERNAME, PASSWORD, 'bench_admin@example.com', 'admin', admin_key='admin123')
+
+        # Importing app after the cohort points its init_db at the cohort
+        import app as application
+        ctx = Context(path, size, application.app)
+
+        functions = {}
+        for name, call, setup in DATABASE_CASES:
+            prepare = (lambda setup=setup: setup(ctx)) if setup else (lambda: ())
+            functions[name] = time_case(call, prepare, runs, budget)
+
+        routes = {}
+        clients = {None: ctx.client(), 'student': ctx.client(ctx.username), 'admin': ctx.client(ADMIN_USERNAME)}
+        for method, rule, role, build in ROUTE_CASES:
+            requests = [(f'{method} {rule}', build)]
+            if rule == '/admin/export_excel':
+                requests = [
+                    (f'{method} {rule}?format={fmt}',
+                     lambda c, t, fmt=fmt: (bump_students(), (f'/admin/export_excel?format={fmt}', {}))[1])
+                    for fmt in EXPORT_ROUTE_FORMATS
+                ]
+            for label, build in requests:
+                client = clients[role]
+                if rule == '/logout':
+                    # Logging out ends the session, so each run gets its own
+                    client = None
+
+                def prepare(build=build, client=client):
+                    test_client = client or ctx.client(ctx.username)
+                    url, kwargs = build(ctx, test_client)
+                    return test_client, method, url, kwargs
+
+                routes[label] = time_case(request_route, prepare, runs, budget)
+
+        db.get_pool().close_all()
+        return {
+            'students': size,
+            'generate_seconds': round(generated, 3),
+            'eligible': db.count_students({'eligible': True}),
+            'functions': functions,
+            'routes': routes,
+            'uncovered_functions': uncovered_functions(),
+            'uncovered_routes': [' '.join(pair) for pair in uncovered_routes(application.app)],
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def request_route(client, method, url, kwargs):
+    response = client.open(url, method=method, **kwargs)
+    # Streamed bodies are only produced when read
+    response.get_data()
+    response.close()
+    if response.status_code >= 500:
+        raise RuntimeError(f'{method} {url} returned {response.status_code}')
+
+def run_suite(args):
+    """Run every case for each cohort size and save the results as JSON"""
+    results = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'runs': args.runs,
+            'budget': args.budget,
+            'git': git_revision(),
+        },
+        'sizes': {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} students...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), 'size', str(size),
+             '--runs', str(args.runs), '--budget', str(args.budget), '--seed', str(args.seed)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, text=True, check=True,
+            # Keep the per-request access log off the console unless asked for
+            env=dict(os.environ, PLACEMENT_LOG_LEVEL=os.environ.get('PLACEMENT_LOG_LEVEL', 'WARNING'))
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results['sizes'][str(size)] = result
+        print_size(result)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+def run_size(args):
+    """Benchmark one cohort size and print its results as JSON (used by run)"""
+    print(json.dumps(bench_size(args.size, args.runs, args.budget, args.seed)))
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_size(result):
+    print(f"\n{result['students']} students ({result['eligible']} eligible), generated in {result['generate_seconds']:.1f}s")
+    print(f"{'case':<60} {'runs':>5} {'median ms':>10} {'p95 ms':>10}")
+    for section in ('functions', 'routes'):
+        for name, stats in result[section].items():
+            print(f"{name:<60} {stats['runs']:>5} {stats['median_ms']:>10.2f} {stats['p95_ms']:>10.2f}")
+    for key in ('uncovered_functions', 'uncovered_routes'):
+        if result[key]:
+            print(f"{key.replace('_', ' ').capitalize()}: {', '.join(result[key])}")
+
+def compare(args):
+    """Compare two result files and exit non-zero on regressions"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    print(f"{'size':>8} {'case':<60} {'baseline ms':>12} {'current ms':>11} {'change':>8}")
+    for size, result in current['sizes'].items():
+        previous = baseline['sizes'].get(size)
+        if previous is None:
+            continue
+        for section in ('functions', 'routes'):
+            for name, stats in result[section].items():
+                before = previous[section].get(name)
+                if before is None:
+                    continue
+                old, new = before['median_ms'], stats['median_ms']
+                change = (new - old) / old if old else 0.0
+                regressed = change > args.threshold and new - old > args.min_ms
+                if regressed or args.verbose:
+                    print(f"{size:>8} {name:<60} {old:>12.2f} {new:>11.2f} {change:>+7.0%}{' !' if regressed else ''}")
+                regressions += regressed
+    if regressions:
+        print(f"{regressions} regressions over {args.threshold:.0%}")
+        sys.exit(1)
+    print("No regressions")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help=run_suite.__doc__)
+    run.add_argument('--sizes', type=parse_size, nargs='+', default=[1000, 10000])
+    run.add_argument('--runs', type=int, default=5, help='timed runs per case')
+    run.add_argument('--budget', type=float, default=2.0,
+                     help='stop timing a case after this many seconds, once it has run at least once')
+    run.add_argument('--seed', type=int, default=42)
+    run.add_argument('--output', default=f'benchmark_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
+    run.set_defaults(func=run_suite)
+
+    size = subparsers.add_parser('size', help=run_size.__doc__)
+    size.add_argument('size', type=parse_size)
+    size.add_argument('--runs', type=int, default=5)
+    size.add_argument('--budget', type=float, default=2.0)
+    size.add_argument('--seed', type=int, default=42)
+    size.set_defaults(func=run_size)
+
+    diff = subparsers.add_parser('compare', help=compare.__doc__)
+    diff.add_argument('baseline')
+    diff.add_argument('current')
+    diff.add_argument('--threshold', type=float, default=0.25,
+                      help='flag cases whose median grew by more than this fraction')
+    diff.add_argument('--min-ms', type=float, default=1.0,
+                      help='ignore slowdowns smaller than this many milliseconds')
+    diff.add_argument('--verbose', action='store_true', help='list every case, not only regressions')
+    diff.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
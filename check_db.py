@@ -1,12 +1,60 @@
 import sqlite3
 import os
+import sys
+
+import database as db
+
+def _first_page_query(*args):
+    """The SQL of the first query a roster page runs"""
+    return db.student_page_queries(*args)[0][0]
+
+# Hot queries issued by database.py, with sample parameters. None of them
+# may fall back to a full table scan.
+HOT_QUERIES = [
+    ('user by id', db.USER_BY_ID_SQL, (1,)),
+    ('user by username', db.USER_BY_USERNAME_SQL, ('student',)),
+    ('profile by user', db.PROFILE_BY_USER_SQL, (1,)),
+    ('students by department', db.STUDENTS_BY_DEPARTMENT_SQL, ('CSE',)),
+    ('all students', db.ALL_STUDENTS_SQL, ()),
+    ('eligible students', db.ELIGIBLE_STUDENTS_SQL, ()),
+    ('export', db.EXPORT_QUERY, ()),
+    ('set eligibility', db.SET_ELIGIBILITY_SQL, {'eligible': 1, 'failed': 0, 'user_id': 1}),
+    ('set approval', db.SET_APPROVAL_SQL, (1, 1)),
+    ('bulk approval by ids', *db.approval_update_sql(True, [1, 2])),
+    # Pages after the first, as the roster requests them; the LIMIT is the last parameter
+    ('roster page by name', _first_page_query(None, None, 'name', False, ('student', 1)), ['student', 1, 26]),
+    ('roster page by cgpa', _first_page_query(None, None, 'cgpa', True, (9.0, 1)), [9.0, 1, 26]),
+    ('roster page by leetcode', _first_page_query(None, None, 'leetcode', False, (100, 1)), [100, 1, 26]),
+    ('eligible roster page by cgpa', _first_page_query({'eligible': 1}, None, 'cgpa', True, (9.0, 1)), [9.0, 1, 26]),
+    ('projects by user', db.PROJECTS_BY_USER_SQL, (1,)),
+    ('students by project domain', db.STUDENTS_BY_PROJECT_DOMAIN_SQL, ('ML',)),
+]
+
+def check_query_plans(conn):
+    """Assert that no hot query plans a full table scan or a sort of its rows"""
+    failures = []
+    for name, query, params in HOT_QUERIES:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+        # "SCAN t USING INDEX ..." only walks an index; a bare "SCAN t" reads the table
+        scans = [step for step in plan if step.startswith('SCAN') and 'INDEX' not in step]
+        sorts = [step for step in plan if step.startswith('USE TEMP B-TREE')]
+        status = 'FULL SCAN' if scans else 'SORT' if sorts else 'ok'
+        print(f"{status:<10} {name}: {' | '.join(plan)}")
+        if scans or sorts:
+            failures.append(name)
+    assert not failures, f"Queries falling back to a table scan or sort: {', '.join(failures)}"
 
 def check_db():
+    """Print the database contents and check the hot query plans
+    
+    Returns False when the database is missing or a hot query plan is bad.
+    """
+    conn = None
     try:
         # Check if database file exists
         if not os.path.exists('placement_tracker.db'):
             print("Database file does not exist!")
-            return
+            return False
             
         # Connect to the database
         conn = sqlite3.connect('placement_tracker.db')
@@ -67,12 +115,22 @@ def check_db():
                     print(dict(student))
         except sqlite3.Error as e:
             print(f"Error checking student profiles: {e}")
+        
+        # Check that the hot queries are index-backed
+        print("\nQuery Plans:")
+        try:
+            check_query_plans(conn)
+        except AssertionError as e:
+            print(f"Error: {e}")
+            return False
+        return True
     
     except Exception as e:
         print(f"Error: {e}")
+        return False
     finally:
         if conn:
             conn.close()
 
 if __name__ == "__main__":
-    check_db() 
\ No newline at end of file
+    sys.exit(0 if check_db() else 1) 
\ No newline at end of file
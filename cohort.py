@@ -0,0 +1,161 @@
+"""Deterministic synthetic student cohorts for benchmarks
+
+Fills users, student_profiles and student_projects with realistic
+distributions: departments of different sizes, CGPAs clustered around 7.5,
+attendance skewed towards 100%, a long tail of LeetCode counts, and profile
+links that are present more often for active students. The same size and
+seed always produce the same rows; only the password salt differs.
+
+Usage:
+    python cohort.py OUTPUT.db [--students N] [--seed N]
+
+N accepts suffixes, e.g. 1k, 10k, 100k or 1m.
+"""
+import argparse
+import random
+
+import database as db
+import passwords
+
+# (department, share of the cohort, specializations)
+DEPARTMENTS = [
+    ('CSE', 0.35, ['AI', 'Data Science', 'Cyber Security', 'Web Development']),
+    ('IT', 0.20, ['Cloud Computing', 'Web Development', 'Data Science']),
+    ('ECE', 0.20, ['Embedded Systems', 'VLSI', 'IoT']),
+    ('MECH', 0.15, ['Robotics', 'Thermal', 'Design']),
+    ('CIVIL', 0.10, ['Structures', 'Transportation']),
+]
+DOMAINS = ['ML', 'Web', 'Mobile', 'IoT', 'Cloud', 'Data', 'Security', 'Embedded']
+SKILLS = ['python', 'java', 'c++', 'sql', 'javascript', 'react', 'flask', 'django',
+          'aws', 'docker', 'pandas', 'matlab', 'verilog', 'autocad', 'dsa']
+FIRST_NAMES = ['aarav', 'diya', 'ishaan', 'ananya', 'vivaan', 'saanvi', 'arjun', 'meera',
+               'kabir', 'priya', 'rohan', 'kavya', 'aditya', 'nisha', 'rahul', 'sneha']
+LAST_NAMES = ['sharma', 'iyer', 'reddy', 'patel', 'nair', 'gupta', 'rao', 'singh',
+              'menon', 'das', 'joshi', 'kumar']
+
+# Share of students who have filled in a profile
+PROFILE_RATE = 0.92
+# Share of eligible students an admin has approved
+APPROVAL_RATE = 0.6
+# The generated students' password
+PASSWORD = 'password'
+
+INSERT_CHUNK = 10000
+
+def parse_size(value):
+    """Parse a cohort size such as 5000, 10k or 1m"""
+    value = value.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+def make_student(user_id, rng):
+    """One (user row, profile row or None, project rows) triple"""
+    roll = rng.random()
+    for department, share, specializations in DEPARTMENTS:
+        roll -= share
+        if roll < 0:
+            break
+    username = f'{rng.choice(FIRST_NAMES)}.{rng.choice(LAST_NAMES)}{user_id}'
+    user = (user_id, username, f'{username}@students.example.edu', 'student',
+            department, rng.choice(specializations))
+    if rng.random() >= PROFILE_RATE:
+        return user, None, []
+
+    # A latent "engagement" score ties the metrics together
+    engagement = rng.gauss(0, 1)
+    cgpa = round(clamp(rng.gauss(7.8 + 0.9 * engagement, 0.5), 4.0, 10.0), 2)
+    attendance = round(clamp(100 - rng.expovariate(1 / (9 - 4 * clamp(engagement, -1, 1))), 40, 100), 2)
+    assessment = round(clamp(rng.gauss(76 + 10 * engagement, 7), 10, 100), 2)
+    leetcode = int(clamp(rng.lognormvariate(4.3 + 0.8 * engagement, 0.8), 0, 2000))
+    project_count = min(round(rng.expovariate(1 / (2.5 + 1.5 * engagement))) if engagement > -1.5 else 0, 8)
+
+    projects = [
+        (user_id, position, f'{domain} project {position + 1}', f'{domain} App {user_id}-{position + 1}',
+         domain, f'https://github.com/{username}/project-{position + 1}')
+        for position, domain in enumerate(rng.choice(DOMAINS) for _ in range(project_count))
+    ]
+    active = engagement > 0
+    profile = (
+        user_id, cgpa, rng.choice(DOMAINS), ','.join(rng.sample(SKILLS, rng.randint(2, 6))),
+        ','.join(project[2] for project in projects),
+        ','.join(project[3] for project in projects),
+        ','.join(project[4] for project in projects),
+        ','.join(project[5] for project in projects),
+        project_count, leetcode,
+        f'https://leetcode.com/{username}' if rng.random() < (0.9 if leetcode > 50 else 0.2) else '',
+        f'https://github.com/{username}' if rng.random() < (0.9 if active else 0.6) else '',
+        f'https://linkedin.com/in/{username}' if rng.random() < 0.8 else '',
+        f'https://{username}.dev' if rng.random() < (0.75 if active else 0.3) else '',
+        assessment, attendance
+    )
+    return user, profile, projects
+
+def generate_cohort(path, students, seed=42, profile=None):
+    """Create a database at path holding a synthetic cohort of students
+
+    Eligibility is computed with the default criteria and a deterministic
+    share of the eligible students is approved. Every student's password is
+    PASSWORD; it is hashed once and the hash is shared.
+    """
+    db.configure_pool(path=path, profile=profile)
+    db.init_db()
+
+    rng = random.Random(seed)
+    password_hash = passwords.get_hasher().hash(PASSWORD)
+    conn = db.get_db_connection()
+    try:
+        for start in range(1, students + 1, INSERT_CHUNK):
+            users, profiles, projects = [], [], []
+            for user_id in range(start, min(start + INSERT_CHUNK, students + 1)):
+                user, student_profile, student_projects = make_student(user_id, rng)
+                users.append(user[:2] + (password_hash,) + user[2:])
+                if student_profile:
+                    profiles.append(student_profile)
+                projects.extend(student_projects)
+            conn.executemany(
+                'INSERT INTO users (id, username, password, email, role, department, specialization) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                users
+            )
+            conn.executemany('''
+                INSERT INTO student_profiles
+                (user_id, semester_cgpa, domain_specialization, skills, projects, project_titles,
+                project_domains, project_github_links, project_count, leetcode_problems, leetcode_profile,
+                github_profile, linkedin_profile, portfolio_link, weekly_assessment_score, attendance_percentage)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', profiles)
+            conn.executemany('''
+                INSERT INTO student_projects (user_id, position, description, title, domain, github_link)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', projects)
+            conn.commit()
+    finally:
+        db.release_db_connection(conn)
+
+    db.update_all_eligibility()
+    conn = db.get_db_connection()
+    try:
+        # Knuth's multiplicative hash spreads the approvals deterministically
+        conn.execute(
+            'UPDATE student_profiles SET is_approved = 1 WHERE is_eligible = 1 AND (user_id * 2654435761) % 1000 < ?',
+            (int(APPROVAL_RATE * 1000),)
+        )
+        conn.commit()
+    finally:
+        db.release_db_connection(conn)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic student cohort')
+    parser.add_argument('output', help='database file to create')
+    parser.add_argument('--students', type=parse_size, default=parse_size('10k'))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generate_cohort(args.output, args.students, seed=args.seed)
+    print(f"Generated {args.students} students in {args.output}")
+    print(f"{db.count_students({'eligible': True})} eligible, {db.count_students({'approved': True})} approved")
+
+if __name__ == '__main__':
+    main()
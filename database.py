@@ -1,18 +1,270 @@
+import atexit
 import sqlite3
 import os
-from flask import session
-from werkzeug.security import generate_password_hash, check_password_hash
+import logging
+import threading
+import itertools
+import json
+from flask import session, g, has_app_context
+import metrics
+import passwords
+import sqltrace
 import time
-import pandas as pd
-import io
+import writer
+
+# Database location and connection pool sizing (overridable via environment)
+DATABASE_PATH = os.environ.get('PLACEMENT_DB', 'placement_tracker.db')
+DB_POOL_SIZE = int(os.environ.get('PLACEMENT_DB_POOL_SIZE', 8))
+DB_POOL_TIMEOUT = float(os.environ.get('PLACEMENT_DB_POOL_TIMEOUT', 10))
+
+# Send every write through a single writer thread that group-commits them
+# (overridable via environment)
+DB_WRITE_QUEUE = os.environ.get('PLACEMENT_WRITE_QUEUE', '0') == '1'
+
+logger = logging.getLogger(__name__)
+
+# Connection-level SQLite settings. 'legacy' keeps SQLite's defaults, where
+# every write blocks every reader; 'wal' lets readers run alongside the writer.
+STORAGE_PROFILES = {
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 20000,
+    },
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 10000,
+        'cache_size': -16000,       # negative values are in KiB
+        'mmap_size': 128 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+STORAGE_PROFILE = os.environ.get('PLACEMENT_DB_PROFILE', 'wal')
+
+def get_storage_profile(name=None):
+    """Get the PRAGMA settings for a storage profile"""
+    name = name or STORAGE_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {name}")
+    return STORAGE_PROFILES[name]
+
+def apply_storage_profile(conn, name=None):
+    """Apply a storage profile's per-connection PRAGMAs"""
+    profile = get_storage_profile(name)
+    for pragma in ('busy_timeout', 'synchronous', 'cache_size', 'mmap_size', 'temp_store'):
+        if pragma in profile:
+            conn.execute(f"PRAGMA {pragma} = {profile[pragma]}")
+
+def _add_lookup_indexes(cur):
+    """Schema v1: indexes for profile lookups, roster filters and eligibility flags"""
+    # Older databases may hold several profiles per user. Keep the first one,
+    # which is the row the lookups by user_id have always returned.
+    cur.execute('''
+    DELETE FROM student_profiles
+    WHERE id NOT IN (SELECT MIN(id) FROM student_profiles GROUP BY user_id)
+    ''')
+    cur.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_student_profiles_user_id ON student_profiles (user_id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_users_role_department ON users (role, department)')
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_student_profiles_eligible
+    ON student_profiles (user_id) WHERE is_eligible = 1
+    ''')
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_student_profiles_approved
+    ON student_profiles (user_id) WHERE is_approved = 1
+    ''')
+
+def split_projects(projects, titles=None, domains=None, github_links=None):
+    """Split the comma separated project fields into one dict per project"""
+    def parts(value):
+        return [part.strip() for part in value.split(',')] if value else []
+    
+    columns = [parts(projects), parts(titles), parts(domains), parts(github_links)]
+    count = max(len(column) for column in columns)
+    return [
+        {
+            'position': i,
+            'description': columns[0][i] if i < len(columns[0]) else '',
+            'title': columns[1][i] if i < len(columns[1]) else '',
+            'domain': columns[2][i] if i < len(columns[2]) else '',
+            'github_link': columns[3][i] if i < len(columns[3]) else ''
+        }
+        for i in range(count)
+    ]
+
+def count_projects(projects, titles=None, domains=None, github_links=None):
+    """Number of projects a student has listed, as used by the eligibility rules
+    
+    The same projects split_projects stores as rows, so the two always agree.
+    """
+    return len(split_projects(projects, titles, domains, github_links))
+
+def _add_projects_table(cur):
+    """Schema v2: projects child table and a stored project_count"""
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS student_projects (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        description TEXT,
+        title TEXT,
+        domain TEXT,
+        github_link TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+    cur.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_student_projects_user ON student_projects (user_id, position)')
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_student_projects_domain
+    ON student_projects (domain COLLATE NOCASE, user_id)
+    ''')
+    
+    columns = {col[1] for col in cur.execute('PRAGMA table_info(student_profiles)').fetchall()}
+    if 'project_count' not in columns:
+        cur.execute('ALTER TABLE student_profiles ADD COLUMN project_count INTEGER DEFAULT 0')
+    
+    # Convert the existing comma separated strings in one pass
+    profiles = cur.execute('''
+    SELECT user_id, projects, project_titles, project_domains, project_github_links
+    FROM student_profiles
+    ''').fetchall()
+    projects = {user_id: split_projects(*fields) for user_id, *fields in profiles}
+    cur.execute('DELETE FROM student_projects')
+    cur.executemany('''
+    INSERT INTO student_projects (user_id, position, description, title, domain, github_link)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (user_id, project['position'], project['description'], project['title'],
+         project['domain'], project['github_link'])
+        for user_id, user_projects in projects.items()
+        for project in user_projects
+    ])
+    cur.executemany(
+        'UPDATE student_profiles SET project_count = ? WHERE user_id = ?',
+        [(len(user_projects), user_id) for user_id, user_projects in projects.items()]
+    )
+
+def _add_data_versions(cur):
+    """Schema v3: change counters shared by every worker process"""
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS data_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cur.executemany(
+        'INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)',
+        [('criteria',), ('admin_settings',)]
+    )
+
+def _add_roster_indexes(cur):
+    """Schema v4: ordered index for paging the student roster by name"""
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_users_role_username ON users (role, username)')
+
+def _add_filter_indexes(cur):
+    """Schema v5: indexes for the roster's specialization and range filters"""
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_users_role_specialization ON users (role, specialization)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_student_profiles_cgpa ON student_profiles (semester_cgpa)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_student_profiles_leetcode ON student_profiles (leetcode_problems)')
+
+def _add_students_version(cur):
+    """Schema v6: change counter for student profile, eligibility and approval writes"""
+    cur.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('students', 0)")
+
+def _add_failed_criteria(cur):
+    """Schema v7: per-rule eligibility failures, for near-miss and failure reason queries"""
+    columns = {col[1] for col in cur.execute('PRAGMA table_info(student_profiles)').fetchall()}
+    if 'failed_criteria' not in columns:
+        cur.execute('ALTER TABLE student_profiles ADD COLUMN failed_criteria INTEGER')
+    cur.execute('''
+    CREATE INDEX IF NOT EXISTS idx_student_profiles_failed_criteria
+    ON student_profiles (failed_criteria, user_id)
+    ''')
+    
+    # Older criteria rows may lack the profile link requirements
+    criteria = {key: 0 for _, key, _ in ELIGIBILITY_RULES}
+    row = cur.execute('SELECT * FROM eligibility_criteria LIMIT 1').fetchone()
+    if row:
+        criteria.update(zip([col[0] for col in cur.description], row))
+        cur.execute(f'UPDATE student_profiles SET failed_criteria = {FAILED_CRITERIA_SQL}', criteria)
+
+def _add_sort_indexes(cur):
+    """Schema v8: (value, user_id) indexes that keep roster pages sorted by CGPA or LeetCode"""
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_student_profiles_cgpa_user ON student_profiles (semester_cgpa, user_id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_student_profiles_leetcode_user ON student_profiles (leetcode_problems, user_id)')
+    # The range filters use these too, so the single-column v5 indexes go
+    cur.execute('DROP INDEX IF EXISTS idx_student_profiles_cgpa')
+    cur.execute('DROP INDEX IF EXISTS idx_student_profiles_leetcode')
+
+def _recount_projects(cur):
+    """Schema v9: project counts that include projects given only a title, domain or link"""
+    profiles = cur.execute('''
+    SELECT user_id, project_count, projects, project_titles, project_domains, project_github_links
+    FROM student_profiles
+    ''').fetchall()
+    recounted = []
+    for user_id, project_count, *fields in profiles:
+        count = count_projects(*fields)
+        if count != project_count:
+            recounted.append((count, user_id))
+    if not recounted:
+        return
+    cur.executemany('UPDATE student_profiles SET project_count = ? WHERE user_id = ?', recounted)
+    
+    # The projects rule reads project_count, so eligibility is recomputed
+    criteria = {key: 0 for _, key, _ in ELIGIBILITY_RULES}
+    row = cur.execute('SELECT * FROM eligibility_criteria LIMIT 1').fetchone()
+    if row:
+        criteria.update(zip([col[0] for col in cur.description], row))
+        cur.execute(f'''
+        UPDATE student_profiles
+        SET failed_criteria = {FAILED_CRITERIA_SQL}, is_eligible = {FAILED_CRITERIA_SQL} = 0
+        ''', criteria)
+
+# Versioned schema steps, applied in order by init_db. The current version is
+# kept in the database's user_version.
+SCHEMA_MIGRATIONS = [
+    (1, _add_lookup_indexes),
+    (2, _add_projects_table),
+    (3, _add_data_versions),
+    (4, _add_roster_indexes),
+    (5, _add_filter_indexes),
+    (6, _add_students_version),
+    (7, _add_failed_criteria),
+    (8, _add_sort_indexes),
+    (9, _recount_projects),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+def migrate_schema(cur):
+    """Apply any schema steps newer than the database's user_version"""
+    current = cur.execute('PRAGMA user_version').fetchone()[0]
+    for version, step in SCHEMA_MIGRATIONS:
+        if version > current:
+            step(cur)
+            cur.execute(f'PRAGMA user_version = {version}')
+    return max(current, SCHEMA_VERSION)
 
 def init_db():
-    """Initialize the database and create necessary tables if they don't exist"""
+    """Initialize the database and create necessary tables if they don't exist
+    
+    A database already at SCHEMA_VERSION is left alone apart from its journal
+    mode, so restarts only pay for two PRAGMA reads.
+    """
     conn = None
     try:
-        conn = sqlite3.connect('placement_tracker.db')
+        profile = get_storage_profile()
+        conn = sqlite3.connect(DATABASE_PATH, timeout=profile['busy_timeout'] / 1000)
         cur = conn.cursor()
         
+        # The journal mode is stored in the database file, so set it once here
+        if cur.execute('PRAGMA journal_mode').fetchone()[0].upper() != profile['journal_mode']:
+            cur.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+        if cur.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+            return
+        apply_storage_profile(conn)
+        
         # Create users table
         cur.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -38,6 +290,7 @@ def init_db():
             project_titles TEXT,
             project_domains TEXT,
             project_github_links TEXT,
+            project_count INTEGER DEFAULT 0,
             leetcode_problems INTEGER DEFAULT 0,
             leetcode_profile TEXT,
             github_profile TEXT,
@@ -47,6 +300,7 @@ def init_db():
             attendance_percentage REAL,
             is_eligible INTEGER DEFAULT 0,
             is_approved INTEGER DEFAULT 0,
+            failed_criteria INTEGER,
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
         ''')
@@ -93,85 +347,446 @@ def init_db():
             VALUES (85.0, 80.0, 8.5, 100, 3, 1, 0, 0, 0)
             ''')
         
+        migrate_schema(cur)
+        
         conn.commit()
     except sqlite3.Error as e:
         if conn:
             conn.rollback()
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
     finally:
         if conn:
             conn.close()
 
-def get_db_connection():
-    """Get database connection"""
-    for attempt in range(3):  # Try up to 3 times
+class ConnectionPool:
+    """Bounded, thread-safe pool of SQLite connections"""
+    
+    def __init__(self, path, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, profile=None):
+        self.path = path
+        self.profile = profile or STORAGE_PROFILE
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+        
+        # Counters used to size the pool under load
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+    
+    def _connect(self):
+        """Open a new connection to the database"""
+        # Lock contention is handled by SQLite's busy handler, which waits up
+        # to busy_timeout for the lock instead of failing straight away.
+        # Pooled connections move between request threads, but only one
+        # thread uses a connection at a time. TimedConnection counts statement
+        # time towards the current request's Server-Timing and metrics.
+        busy_timeout = get_storage_profile(self.profile)['busy_timeout']
+        conn = sqlite3.connect(self.path, timeout=busy_timeout / 1000, check_same_thread=False,
+                               factory=metrics.TimedConnection)
+        conn.row_factory = sqlite3.Row
+        apply_storage_profile(conn, self.profile)
+        if sqltrace.SQL_TRACE:
+            sqltrace.install(conn, metrics.current_timer)
+        return conn
+    
+    def acquire(self):
+        """Take a connection from the pool, opening one if below the size limit"""
+        with self._cond:
+            waited_since = None
+            while True:
+                if self._idle:
+                    if waited_since is None:
+                        self.hits += 1
+                    else:
+                        self._record_wait(time.perf_counter() - waited_since)
+                    return self._idle.pop()
+                
+                if self._open < self.max_size:
+                    self._open += 1
+                    self.misses += 1
+                    if waited_since is not None:
+                        self._record_wait(time.perf_counter() - waited_since)
+                    break
+                
+                # Pool is exhausted, wait for a connection to be released
+                if waited_since is None:
+                    waited_since = time.perf_counter()
+                    self.waits += 1
+                remaining = self.timeout - (time.perf_counter() - waited_since)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    self._record_wait(time.perf_counter() - waited_since)
+                    raise sqlite3.OperationalError("Timed out waiting for a pooled database connection")
+                self._cond.wait(remaining)
+        
         try:
-            conn = sqlite3.connect('placement_tracker.db', timeout=20)
-            conn.row_factory = sqlite3.Row
-            return conn
-        except sqlite3.OperationalError as e:
-            if "database is locked" in str(e) and attempt < 2:
-                time.sleep(1)  # Wait a bit before retrying
-            else:
-                raise
-    return None
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+    
+    def release(self, conn):
+        """Return a connection to the pool, discarding it if it is unusable"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+    
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+    
+    def _record_wait(self, waited):
+        self.wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+    
+    def close_all(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+    
+    def stats(self):
+        """Get pool hit/miss and wait-time counters"""
+        with self._cond:
+            requests = self.hits + self.misses
+            return {
+                'max_size': self.max_size,
+                'profile': self.profile,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'total_wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time
+            }
 
-def register_user(username, password, email, role, department=None, specialization=None, admin_key=None):
-    """Register a new user"""
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Get the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DATABASE_PATH)
+    return _pool
+
+def configure_pool(path=None, max_size=None, timeout=None, profile=None):
+    """Replace the connection pool, e.g. to point it at another database file"""
+    global _pool, DATABASE_PATH, STORAGE_PROFILE
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        close_writer()
+        if path is not None:
+            DATABASE_PATH = path
+        if profile is not None:
+            get_storage_profile(profile)
+            STORAGE_PROFILE = profile
+        _pool = ConnectionPool(
+            DATABASE_PATH,
+            max_size=max_size if max_size is not None else DB_POOL_SIZE,
+            timeout=timeout if timeout is not None else DB_POOL_TIMEOUT
+        )
+    return _pool
+
+def get_pool_stats():
+    """Get connection pool counters"""
+    stats = get_pool().stats()
+    if _writer is not None:
+        stats['writer'] = _writer.stats()
+    return stats
+
+_writer = None
+_writer_lock = threading.Lock()
+
+def get_writer():
+    """Get the process-wide write queue, starting its thread on first use
+    
+    The writer has its own connection, opened like a pooled one.
+    """
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = writer.WriteQueue(get_pool()._connect)
+    return _writer
+
+def close_writer():
+    """Commit the queued writes and stop the writer, if it is running"""
+    global _writer
+    with _writer_lock:
+        write_queue, _writer = _writer, None
+    if write_queue is not None:
+        write_queue.close()
+
+atexit.register(close_writer)
+
+def submit_write(body, *args):
+    """Queue the transaction body(conn, *args) on the writer and return its Future"""
+    return get_writer().submit(body, *args)
+
+def run_write(body, *args):
+    """Run the transaction body(conn, *args) and commit it, returning its result
+    
+    In write-queue mode the body runs on the writer thread, batched with
+    other writes, and this waits for its batch to commit. Otherwise it runs
+    on the caller's connection in its own IMMEDIATE transaction. Errors are
+    raised after the body's changes are rolled back.
+    """
+    if DB_WRITE_QUEUE:
+        return get_writer().submit(body, *args).result()
     conn = None
     try:
         conn = get_db_connection()
-        if not conn:
-            return False
-        
-        # Check admin key if registering as admin
-        if role == 'admin':
-            if not admin_key:
-                return False
-            
-            # Verify admin key
-            admin_settings = conn.execute('SELECT admin_key FROM admin_settings WHERE id = 1').fetchone()
-            if not admin_settings or admin_settings['admin_key'] != admin_key:
-                return False
-            
-        hashed_password = generate_password_hash(password)
-        conn.execute(
-            'INSERT INTO users (username, password, email, role, department, specialization) VALUES (?, ?, ?, ?, ?, ?)',
-            (username, hashed_password, email, role, department, specialization)
-        )
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        result = body(conn, *args)
         conn.commit()
-        return True
-    except sqlite3.IntegrityError:
+        return result
+    except BaseException:
         if conn:
             conn.rollback()
+        raise
+    finally:
+        release_db_connection(conn)
+
+def get_db_connection():
+    """Get database connection
+    
+    Inside a Flask app context the same pooled connection is handed out to
+    every helper for the rest of the request and released on teardown.
+    """
+    if has_app_context():
+        if '_db_conn' not in g:
+            g._db_conn = get_pool().acquire()
+        return g._db_conn
+    return get_pool().acquire()
+
+def release_db_connection(conn):
+    """Release a connection obtained from get_db_connection"""
+    if conn is None:
+        return
+    if has_app_context() and g.get('_db_conn') is conn:
+        # Request-scoped connection, released by close_db on teardown
+        return
+    get_pool().release(conn)
+
+def close_db(exception=None):
+    """Return the request's connection to the pool"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+def init_app(app):
+    """Register request-scoped connection handling with a Flask app"""
+    if any(key in app.config for key in ('DB_POOL_SIZE', 'DB_POOL_TIMEOUT', 'DB_STORAGE_PROFILE')):
+        configure_pool(
+            max_size=app.config.get('DB_POOL_SIZE'),
+            timeout=app.config.get('DB_POOL_TIMEOUT'),
+            profile=app.config.get('DB_STORAGE_PROFILE')
+        )
+    app.teardown_appcontext(close_db)
+
+# How long a cached value is trusted before its version is checked again.
+# Writes in this process invalidate immediately; other workers' writes are
+# picked up within this interval.
+CACHE_REVALIDATE_INTERVAL = float(os.environ.get('PLACEMENT_CACHE_REVALIDATE_INTERVAL', 1.0))
+
+class VersionedCache:
+    """Read-through cache for small tables, invalidated by data_versions counters"""
+    
+    def __init__(self, revalidate_interval=CACHE_REVALIDATE_INTERVAL):
+        self.revalidate_interval = revalidate_interval
+        self._entries = {}  # name -> [version, value, checked_at]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+    
+    def get(self, conn, name, loader, revalidate=False):
+        """Get a cached value, reloading it with loader(conn) when its version moved
+        
+        revalidate checks the version even within the revalidate interval.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and not revalidate and now - entry[2] < self.revalidate_interval:
+                self.hits += 1
+                return entry[1]
+        
+        row = conn.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+        version = row['version'] if row else 0
+        with self._lock:
+            self.revalidations += 1
+            entry = self._entries.get(name)
+            if entry and entry[0] == version:
+                entry[2] = now
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        
+        value = loader(conn)
+        with self._lock:
+            self._entries[name] = [version, value, now]
+        return value
+    
+    def invalidate(self, name=None):
+        """Forget one cached value, or all of them"""
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+    
+    def stats(self):
+        """Get cache hit-rate counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'revalidations': self.revalidations,
+                'revalidate_interval': self.revalidate_interval
+            }
+
+_settings_cache = VersionedCache()
+
+def get_cache_stats():
+    """Get settings cache counters"""
+    return _settings_cache.stats()
+
+def bump_data_version(conn, name):
+    """Increment a change counter inside the caller's transaction"""
+    conn.execute('''
+        INSERT INTO data_versions (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    ''', (name,))
+
+def get_export_version(conn=None):
+    """Cheap version tag for the exported data
+    
+    Combines the counters bumped by student and criteria writes, so it moves
+    whenever the eligible set or its contents may have changed.
+    """
+    owned = conn is None
+    if owned:
+        conn = get_db_connection()
+    try:
+        versions = dict(conn.execute(
+            "SELECT name, version FROM data_versions WHERE name IN ('students', 'criteria')"
+        ).fetchall())
+        return f"{versions.get('students', 0)}.{versions.get('criteria', 0)}"
+    finally:
+        if owned:
+            release_db_connection(conn)
+
+def _load_criteria(conn):
+    criteria = conn.execute('SELECT * FROM eligibility_criteria LIMIT 1').fetchone()
+    return dict(criteria) if criteria else None
+
+def _load_admin_settings(conn):
+    settings = conn.execute('SELECT * FROM admin_settings WHERE id = 1').fetchone()
+    return dict(settings) if settings else None
+
+def _cached_criteria(conn, revalidate=False):
+    criteria = _settings_cache.get(conn, 'criteria', _load_criteria, revalidate)
+    # Callers get their own copy so they can't modify the cached dict
+    return dict(criteria) if criteria else None
+
+def _cached_admin_settings(conn):
+    settings = _settings_cache.get(conn, 'admin_settings', _load_admin_settings)
+    return dict(settings) if settings else None
+
+def _add_user(conn, username, hashed_password, email, role, department, specialization):
+    conn.execute(
+        'INSERT INTO users (username, password, email, role, department, specialization) VALUES (?, ?, ?, ?, ?, ?)',
+        (username, hashed_password, email, role, department, specialization)
+    )
+    return True
+
+def register_user(username, password, email, role, department=None, specialization=None, admin_key=None):
+    """Register a new user"""
+    # Check admin key if registering as admin
+    if role == 'admin':
+        if not admin_key or get_admin_key() != admin_key:
+            return False
+    
+    try:
+        hashed_password = passwords.hash_password(password)
+        return run_write(_add_user, username, hashed_password, email, role, department, specialization)
+    except sqlite3.IntegrityError:
         return False
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return False
-    finally:
-        if conn:
-            conn.close()
+
+# Queries on the request path, checked for index-backed plans by check_db.py
+USER_BY_USERNAME_SQL = 'SELECT * FROM users WHERE username = ?'
+USER_BY_ID_SQL = 'SELECT * FROM users WHERE id = ?'
 
 def authenticate_user(username, password):
-    """Authenticate a user"""
+    """Authenticate a user
+    
+    A stored hash made with other parameters than the configured hasher's is
+    replaced on a successful login.
+    """
     conn = None
     try:
         conn = get_db_connection()
         if not conn:
             return None
             
-        user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-        if user and check_password_hash(user['password'], password):
-            return dict(user)
-        return None
+        user = conn.execute(USER_BY_USERNAME_SQL, (username,)).fetchone()
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return None
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+    
+    if not user or not passwords.check_password(user['password'], password):
+        return None
+    
+    if passwords.needs_rehash(user['password']):
+        try:
+            run_write(_replace_password_hash, user['id'], user['password'], passwords.hash_password(password))
+        except sqlite3.Error as e:
+            # The old hash still works, so the login goes ahead
+            logger.error("Database error: %s", e)
+    return dict(user)
+
+def _replace_password_hash(conn, user_id, old_hash, new_hash):
+    # Only replace the hash this login verified
+    conn.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?', (new_hash, user_id, old_hash))
 
 def get_user_by_id(user_id):
     """Get user by ID"""
@@ -181,70 +796,195 @@ def get_user_by_id(user_id):
         if not conn:
             return None
             
-        user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+        user = conn.execute(USER_BY_ID_SQL, (user_id,)).fetchone()
         return dict(user) if user else None
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return None
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+# Student profile columns written by a profile save
+PROFILE_FORM_COLUMNS = [
+    'semester_cgpa', 'domain_specialization', 'skills',
+    'projects', 'project_titles', 'project_domains', 'project_github_links',
+    'leetcode_problems', 'leetcode_profile', 'github_profile', 'linkedin_profile', 'portfolio_link',
+    'weekly_assessment_score', 'attendance_percentage'
+]
+
+# Writes the profile and its eligibility in one statement, creating the row on first save
+PROFILE_UPSERT_SQL = f"""
+    INSERT INTO student_profiles
+    (user_id, {', '.join(PROFILE_FORM_COLUMNS)}, project_count, is_eligible, failed_criteria)
+    VALUES (:user_id, {', '.join(':' + column for column in PROFILE_FORM_COLUMNS)},
+            :project_count, :is_eligible, :failed_criteria)
+    ON CONFLICT(user_id) DO UPDATE SET
+        {', '.join(f'{column} = excluded.{column}' for column in
+                   PROFILE_FORM_COLUMNS + ['project_count', 'is_eligible', 'failed_criteria'])}
+"""
+
+def _save_student_profile(conn, user_id, data):
+    projects = split_projects(data['projects'], data['project_titles'],
+                              data['project_domains'], data['project_github_links'])
+    profile = dict(data, user_id=user_id, project_count=len(projects))
+    
+    # Eligibility is evaluated on the submitted values, so the profile is never
+    # read back. The criteria version is checked, as in _check_eligibility.
+    criteria = _cached_criteria(conn, revalidate=True)
+    profile['failed_criteria'] = failed_criteria(profile, criteria) if criteria else None
+    profile['is_eligible'] = 1 if profile['failed_criteria'] == 0 else 0
+    conn.execute(PROFILE_UPSERT_SQL, profile)
+    
+    # Replace the student's project rows
+    conn.execute('DELETE FROM student_projects WHERE user_id = ?', (user_id,))
+    conn.executemany('''
+        INSERT INTO student_projects (user_id, position, description, title, domain, github_link)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', [
+        (user_id, project['position'], project['description'], project['title'],
+         project['domain'], project['github_link'])
+        for project in projects
+    ])
+    
+    bump_data_version(conn, 'students')
+    return True
 
 def update_student_profile(user_id, data):
-    """Update or create student profile"""
+    """Update or create student profile
+    
+    The profile, its eligibility under the current criteria and its project
+    rows are written in one transaction.
+    """
+    try:
+        return run_write(_save_student_profile, user_id, data)
+    except sqlite3.Error as e:
+        logger.error("Database error during profile update: %s", e)
+        return False
+
+# Student profile columns a bulk import may set
+IMPORT_PROFILE_COLUMNS = [
+    'semester_cgpa', 'domain_specialization', 'skills', 'projects', 'project_titles',
+    'project_domains', 'project_github_links', 'leetcode_problems', 'leetcode_profile',
+    'github_profile', 'linkedin_profile', 'portfolio_link', 'weekly_assessment_score',
+    'attendance_percentage',
+]
+
+def find_users(usernames, emails):
+    """Get the users holding any of the given usernames or emails, or None on a database error"""
     conn = None
     try:
         conn = get_db_connection()
         if not conn:
-            return False
-            
-        profile = conn.execute('SELECT * FROM student_profiles WHERE user_id = ?', (user_id,)).fetchone()
-        
-        if profile:
-            conn.execute('''
-                UPDATE student_profiles SET 
-                semester_cgpa = ?, domain_specialization = ?, skills = ?,
-                projects = ?, project_titles = ?, project_domains = ?, project_github_links = ?,
-                leetcode_problems = ?, leetcode_profile = ?, github_profile = ?,
-                linkedin_profile = ?, portfolio_link = ?, weekly_assessment_score = ?,
-                attendance_percentage = ?
-                WHERE user_id = ?
-            ''', (
-                data['semester_cgpa'], data['domain_specialization'], data['skills'],
-                data['projects'], data['project_titles'], data['project_domains'], data['project_github_links'],
-                data['leetcode_problems'], data['leetcode_profile'], data['github_profile'],
-                data['linkedin_profile'], data['portfolio_link'], data['weekly_assessment_score'],
-                data['attendance_percentage'], user_id
-            ))
-        else:
-            conn.execute('''
-                INSERT INTO student_profiles 
-                (user_id, semester_cgpa, domain_specialization, skills, projects, project_titles, project_domains, project_github_links, 
-                leetcode_problems, leetcode_profile, github_profile, linkedin_profile, portfolio_link, 
-                weekly_assessment_score, attendance_percentage)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id, data['semester_cgpa'], data['domain_specialization'], data['skills'],
-                data['projects'], data['project_titles'], data['project_domains'], data['project_github_links'],
-                data['leetcode_problems'], data['leetcode_profile'], data['github_profile'],
-                data['linkedin_profile'], data['portfolio_link'], data['weekly_assessment_score'],
-                data['attendance_percentage']
-            ))
-        
-        conn.commit()
-        
-        # Check eligibility based on criteria
-        check_eligibility(user_id)
+            return []
         
-        return True
+        usernames, emails = list(usernames), list(emails)
+        return [dict(row) for row in conn.execute(f'''
+            SELECT id, username, email, role FROM users
+            WHERE username IN ({', '.join('?' * len(usernames)) or 'NULL'})
+               OR email IN ({', '.join('?' * len(emails)) or 'NULL'})
+        ''', usernames + emails)]
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        print(f"Database error during profile update: {e}")
-        return False
+        logger.error("Database error: %s", e)
+        return None
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+def _import_students(conn, students, profile_columns):
+    cursor = conn.executemany('''
+        INSERT INTO users (username, password, email, role, department, specialization)
+        VALUES (:username, COALESCE(:password, ''), :email, 'student', :department, :specialization)
+        ON CONFLICT(username) DO UPDATE SET
+            email = excluded.email,
+            department = excluded.department,
+            specialization = COALESCE(excluded.specialization, users.specialization)
+    ''', students)
+    
+    usernames = [student['username'] for student in students]
+    user_ids = dict(conn.execute(
+        f"SELECT username, id FROM users WHERE username IN ({', '.join('?' * len(usernames))})",
+        usernames
+    ).fetchall())
+    
+    if profile_columns:
+        projects = {
+            student['username']: split_projects(student.get('projects'), student.get('project_titles'),
+                                                student.get('project_domains'), student.get('project_github_links'))
+            for student in students
+        }
+        columns = list(profile_columns)
+        if 'projects' in columns:
+            columns.append('project_count')
+        conn.executemany(f'''
+            INSERT INTO student_profiles (user_id, {', '.join(columns)})
+            VALUES (:user_id, {', '.join(':' + column for column in columns)})
+            ON CONFLICT(user_id) DO UPDATE SET
+                {', '.join(f'{column} = excluded.{column}' for column in columns)}
+        ''', [
+            dict(student, user_id=user_ids[student['username']],
+                 project_count=len(projects[student['username']]))
+            for student in students
+        ])
+        
+        if 'projects' in columns:
+            conn.executemany('DELETE FROM student_projects WHERE user_id = ?',
+                             [(user_ids[student['username']],) for student in students])
+            conn.executemany('''
+                INSERT INTO student_projects (user_id, position, description, title, domain, github_link)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [
+                (user_ids[student['username']], project['position'], project['description'],
+                 project['title'], project['domain'], project['github_link'])
+                for student in students
+                for project in projects[student['username']]
+            ])
+    
+    # Email and department changes alone are exported too
+    if cursor.rowcount:
+        bump_data_version(conn, 'students')
+    
+    return user_ids
+
+def import_student_batch(students, profile_columns):
+    """Upsert a batch of imported students in a single transaction
+    
+    Each student is a dict with username, email, department, specialization,
+    a password hash (None for existing users, whose password is kept) and the
+    given profile_columns. Only those profile columns are written, so columns
+    missing from the import file keep their stored values. Eligibility is
+    left to the caller. Returns the students' user ids by username.
+    """
+    return run_write(_import_students, students, profile_columns)
+
+PROFILE_BY_USER_SQL = 'SELECT * FROM student_profiles WHERE user_id = ?'
+PROJECTS_BY_USER_SQL = 'SELECT * FROM student_projects WHERE user_id = ? ORDER BY position'
+
+# Student rows with their profiles, as the admin dashboard lists them
+STUDENTS_BY_PROJECT_DOMAIN_SQL = """
+    SELECT u.id, u.username, u.email, u.department, sp.*
+    FROM users u
+    JOIN student_profiles sp ON u.id = sp.user_id
+    WHERE u.role = 'student' AND u.id IN (
+        SELECT user_id FROM student_projects WHERE domain = ? COLLATE NOCASE
+    )
+"""
+STUDENTS_BY_DEPARTMENT_SQL = """
+    SELECT u.id, u.username, u.email, u.department, sp.*
+    FROM users u
+    LEFT JOIN student_profiles sp ON u.id = sp.user_id
+    WHERE u.role = 'student' AND u.department = ?
+"""
+ALL_STUDENTS_SQL = """
+    SELECT u.id, u.username, u.email, u.department, sp.*
+    FROM users u
+    LEFT JOIN student_profiles sp ON u.id = sp.user_id
+    WHERE u.role = 'student'
+"""
+ELIGIBLE_STUDENTS_SQL = """
+    SELECT u.id, u.username, u.email, u.department, sp.*
+    FROM users u
+    JOIN student_profiles sp ON u.id = sp.user_id
+    WHERE u.role = 'student' AND sp.is_eligible = 1
+"""
 
 def get_student_profile(user_id):
     """Get student profile by user ID"""
@@ -254,14 +994,45 @@ def get_student_profile(user_id):
         if not conn:
             return None
             
-        profile = conn.execute('SELECT * FROM student_profiles WHERE user_id = ?', (user_id,)).fetchone()
+        profile = conn.execute(PROFILE_BY_USER_SQL, (user_id,)).fetchone()
         return dict(profile) if profile else None
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return None
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+def get_student_projects(user_id):
+    """Get a student's projects in the order they were entered"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+            
+        projects = conn.execute(PROJECTS_BY_USER_SQL, (user_id,)).fetchall()
+        return [dict(project) for project in projects]
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", e)
+        return []
+    finally:
+        release_db_connection(conn)
+
+def get_students_by_project_domain(domain):
+    """Get students with at least one project in the given domain (case-insensitive)"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return []
+            
+        students = conn.execute(STUDENTS_BY_PROJECT_DOMAIN_SQL, (domain,)).fetchall()
+        return [dict(student) for student in students]
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", e)
+        return []
+    finally:
+        release_db_connection(conn)
 
 def get_all_students_by_department(department):
     """Get all students by department with their profiles"""
@@ -271,19 +1042,13 @@ def get_all_students_by_department(department):
         if not conn:
             return []
             
-        students = conn.execute('''
-            SELECT u.id, u.username, u.email, u.department, sp.*
-            FROM users u
-            LEFT JOIN student_profiles sp ON u.id = sp.user_id
-            WHERE u.role = 'student' AND u.department = ?
-        ''', (department,)).fetchall()
+        students = conn.execute(STUDENTS_BY_DEPARTMENT_SQL, (department,)).fetchall()
         return [dict(student) for student in students]
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return []
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
 
 def get_all_students():
     """Get all students with their profiles"""
@@ -293,19 +1058,13 @@ def get_all_students():
         if not conn:
             return []
             
-        students = conn.execute('''
-            SELECT u.id, u.username, u.email, u.department, sp.*
-            FROM users u
-            LEFT JOIN student_profiles sp ON u.id = sp.user_id
-            WHERE u.role = 'student'
-        ''').fetchall()
+        students = conn.execute(ALL_STUDENTS_SQL).fetchall()
         return [dict(student) for student in students]
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return []
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
 
 def get_eligible_students():
     """Get all eligible students"""
@@ -315,230 +1074,593 @@ def get_eligible_students():
         if not conn:
             return []
             
-        students = conn.execute('''
-            SELECT u.id, u.username, u.email, u.department, sp.*
-            FROM users u
-            JOIN student_profiles sp ON u.id = sp.user_id
-            WHERE u.role = 'student' AND sp.is_eligible = 1
-        ''').fetchall()
+        students = conn.execute(ELIGIBLE_STUDENTS_SQL).fetchall()
         return [dict(student) for student in students]
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return []
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
 
-def get_eligibility_criteria():
-    """Get current eligibility criteria"""
+# Sort keys for the paginated roster: (column, index on (column, user_id)).
+# Students without a profile value sort before every value.
+STUDENT_SORT_KEYS = {
+    'name': ('u.username', None),
+    'cgpa': ('sp.semester_cgpa', 'idx_student_profiles_cgpa_user'),
+    'leetcode': ('sp.leetcode_problems', 'idx_student_profiles_leetcode_user'),
+}
+
+# Columns the roster can return, by name
+STUDENT_COLUMNS = {
+    'id': 'u.id',
+    'username': 'u.username',
+    'email': 'u.email',
+    'department': 'u.department',
+    'specialization': 'u.specialization',
+    'semester_cgpa': 'sp.semester_cgpa',
+    'domain_specialization': 'sp.domain_specialization',
+    'skills': 'sp.skills',
+    'project_count': 'sp.project_count',
+    'leetcode_problems': 'sp.leetcode_problems',
+    'weekly_assessment_score': 'sp.weekly_assessment_score',
+    'attendance_percentage': 'sp.attendance_percentage',
+    'is_eligible': 'sp.is_eligible',
+    'is_approved': 'sp.is_approved',
+}
+DEFAULT_STUDENT_COLUMNS = [
+    'id', 'username', 'department', 'specialization', 'semester_cgpa', 'skills',
+    'leetcode_problems', 'weekly_assessment_score', 'is_eligible', 'is_approved'
+]
+MAX_PAGE_SIZE = 100
+
+def _student_filter_sql(filters):
+    """WHERE conditions and parameters for roster filters
+    
+    Supported filters: department, specialization, eligible, approved,
+    min_cgpa, max_cgpa, min_leetcode, max_leetcode and search (a substring
+    of the username or skills).
+    """
+    filters = filters or {}
+    conditions = ["u.role = 'student'"]
+    params = []
+    
+    for name, column in (('department', 'u.department'), ('specialization', 'u.specialization')):
+        if filters.get(name):
+            conditions.append(f'{column} = ?')
+            params.append(filters[name])
+    
+    for name, column in (('eligible', 'sp.is_eligible'), ('approved', 'sp.is_approved')):
+        if filters.get(name) is not None:
+            if filters[name]:
+                conditions.append(f'{column} = 1')
+            else:
+                conditions.append(f'COALESCE({column}, 0) = 0')
+    
+    for name, condition in (
+        ('min_cgpa', 'sp.semester_cgpa >= ?'),
+        ('max_cgpa', 'sp.semester_cgpa <= ?'),
+        ('min_leetcode', 'sp.leetcode_problems >= ?'),
+        ('max_leetcode', 'sp.leetcode_problems <= ?'),
+    ):
+        if filters.get(name) is not None:
+            conditions.append(condition)
+            params.append(filters[name])
+    
+    if filters.get('search'):
+        pattern = '%' + filters['search'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        conditions.append("(u.username LIKE ? ESCAPE '\\' OR sp.skills LIKE ? ESCAPE '\\')")
+        params.extend([pattern, pattern])
+    
+    return conditions, params
+
+def _filters_need_profile(filters):
+    """Whether the roster filters only match students with a profile row"""
+    filters = filters or {}
+    return bool(filters.get('eligible') or filters.get('approved') or any(
+        filters.get(name) is not None for name in ('min_cgpa', 'max_cgpa', 'min_leetcode', 'max_leetcode')
+    ))
+
+def student_page_queries(filters=None, columns=None, sort='name', descending=False, after=None):
+    """SQL for one roster page, as a list of (query, parameters) to run in order
+    
+    Arguments are as for get_students_page. Each query takes its row limit
+    as one more, final parameter; later queries only run when the earlier
+    ones returned fewer rows than the page needs. Every query is read in the
+    order of an index, so no page sorts the whole filtered cohort.
+    """
+    if sort not in STUDENT_SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    columns = list(columns or DEFAULT_STUDENT_COLUMNS)
+    unknown = [column for column in columns if column not in STUDENT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    if 'id' not in columns:
+        columns.insert(0, 'id')
+    
+    key, index = STUDENT_SORT_KEYS[sort]
+    direction = 'DESC' if descending else 'ASC'
+    comparison = '<' if descending else '>'
+    conditions, params = _student_filter_sql(filters)
+    
+    # Segments are (FROM clause, conditions, parameters, ORDER BY columns
+    # ending in the user ID). The planner would rather filter on an index and
+    # sort, so profile sorts pin the join order and index: values walk the sort
+    # index, missing values the user IDs.
+    if index is None:
+        values = ('users u LEFT JOIN student_profiles sp ON u.id = sp.user_id', [], [], [key, 'u.id'])
+        segments = [values]
+        nulls = None
+    else:
+        profiles = f'student_profiles sp INDEXED BY {index} CROSS JOIN users u ON u.id = sp.user_id'
+        values = (profiles, [f'{key} IS NOT NULL'], [], [key, 'sp.user_id'])
+        if _filters_need_profile(filters):
+            # Students without a profile can't match, so the NULL keys of the index suffice
+            nulls = (profiles, [f'{key} IS NULL'], [], ['sp.user_id'])
+        else:
+            nulls = ('users u NOT INDEXED LEFT JOIN student_profiles sp INDEXED BY idx_student_profiles_user_id '
+                     'ON u.id = sp.user_id', [f'{key} IS NULL'], [], ['u.id'])
+        segments = [values, nulls] if descending else [nulls, values]
+    
+    if after is not None:
+        # Resume inside the cursor's segment; the ones before it are done
+        current = nulls if after[0] is None and nulls else values
+        segments = segments[segments.index(current):]
+        if current is values:
+            current[1].append(f'({key}, {current[3][-1]}) {comparison} (?, ?)')
+            current[2].extend(after)
+        else:
+            current[1].append(f'{current[3][-1]} {comparison} ?')
+            current[2].append(after[1])
+    
+    select = ', '.join(f'{STUDENT_COLUMNS[column]} AS {column}' for column in columns)
+    return [(f'''
+        SELECT {select}, {key} AS sort_value
+        FROM {source}
+        WHERE {' AND '.join(conditions + extra)}
+        ORDER BY {', '.join(f'{column} {direction}' for column in order)}
+        LIMIT ?
+    ''', params + extra_params) for source, extra, extra_params, order in segments]
+
+def get_students_page(filters=None, columns=None, sort='name', descending=False, limit=25, after=None):
+    """Get one page of students using keyset pagination
+    
+    Rows matching `filters` (see _student_filter_sql) are ordered by the sort
+    key with the user ID as a tie-breaker, and only the requested columns are
+    returned. `after` is the (sort value, user ID) pair of the last row on the
+    previous page. Students without a value for the sort key come first
+    (last when descending), by user ID. Returns the page and the pair to pass
+    for the next one, or None after the last page.
+    """
+    queries = student_page_queries(filters, columns, sort, descending, after)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    
     conn = None
     try:
         conn = get_db_connection()
         if not conn:
-            return None
-            
-        criteria = conn.execute('SELECT * FROM eligibility_criteria LIMIT 1').fetchone()
-        return dict(criteria) if criteria else None
+            return [], None
+        
+        # One extra row tells us whether another page follows
+        students = []
+        for query, params in queries:
+            students += conn.execute(query, params + [limit + 1 - len(students)]).fetchall()
+            if len(students) > limit:
+                break
+        
+        page = [dict(student) for student in students[:limit]]
+        next_after = None
+        if len(students) > limit:
+            next_after = (page[-1]['sort_value'], page[-1]['id'])
+        for student in page:
+            del student['sort_value']
+        return page, next_after
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
-        return None
+        logger.error("Database error: %s", e)
+        return [], None
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
 
-def update_eligibility_criteria(criteria):
-    """Update eligibility criteria"""
+def count_students(filters=None):
+    """Count the students matching the roster filters"""
+    conditions, params = _student_filter_sql(filters)
     conn = None
     try:
-        print("Starting criteria update with values:", criteria)
         conn = get_db_connection()
         if not conn:
-            print("Failed to get database connection")
-            return False
-        
-        # Ensure all required fields are present
-        required_fields = [
-            'min_attendance', 'min_assessment_score', 'min_cgpa',
-            'min_leetcode_problems', 'min_projects', 'require_portfolio',
-            'require_leetcode_profile', 'require_github_profile', 'require_linkedin_profile'
-        ]
-        
-        for field in required_fields:
-            if field not in criteria:
-                print(f"Missing required field: {field}")
-                return False
-        
-        # Check if the table has all the necessary columns
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA table_info(eligibility_criteria)")
-        columns = {col['name'] for col in cursor.fetchall()}
-        
-        # Check if we need to add any missing columns
-        missing_columns = []
-        if 'require_leetcode_profile' not in columns:
-            missing_columns.append(("require_leetcode_profile", "INTEGER DEFAULT 0"))
-        if 'require_github_profile' not in columns:
-            missing_columns.append(("require_github_profile", "INTEGER DEFAULT 0"))
-        if 'require_linkedin_profile' not in columns:
-            missing_columns.append(("require_linkedin_profile", "INTEGER DEFAULT 0"))
-        
-        # Add any missing columns
-        for col_name, col_type in missing_columns:
-            try:
-                print(f"Adding missing column: {col_name}")
-                cursor.execute(f"ALTER TABLE eligibility_criteria ADD COLUMN {col_name} {col_type}")
-                conn.commit()
-            except Exception as e:
-                print(f"Error adding column {col_name}: {e}")
+            return 0
         
-        # Now perform the update
-        cursor.execute('''
-            UPDATE eligibility_criteria SET
-            min_attendance = ?,
-            min_assessment_score = ?,
-            min_cgpa = ?,
-            min_leetcode_problems = ?,
-            min_projects = ?,
-            require_portfolio = ?,
-            require_leetcode_profile = ?,
-            require_github_profile = ?,
-            require_linkedin_profile = ?
-            WHERE id = 1
-        ''', (
-            criteria['min_attendance'],
-            criteria['min_assessment_score'],
-            criteria['min_cgpa'],
-            criteria['min_leetcode_problems'],
-            criteria['min_projects'],
-            criteria['require_portfolio'],
-            criteria['require_leetcode_profile'],
-            criteria['require_github_profile'],
-            criteria['require_linkedin_profile']
-        ))
-        
-        # If no rows were affected, insert a new record
-        if cursor.rowcount == 0:
-            print("No rows updated, inserting new criteria")
-            cursor.execute('''
-                INSERT OR IGNORE INTO eligibility_criteria 
-                (id, min_attendance, min_assessment_score, min_cgpa, min_leetcode_problems, min_projects, 
-                require_portfolio, require_leetcode_profile, require_github_profile, require_linkedin_profile)
-                VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                criteria['min_attendance'],
-                criteria['min_assessment_score'],
-                criteria['min_cgpa'],
-                criteria['min_leetcode_problems'],
-                criteria['min_projects'],
-                criteria['require_portfolio'],
-                criteria['require_leetcode_profile'],
-                criteria['require_github_profile'],
-                criteria['require_linkedin_profile']
-            ))
-        
-        conn.commit()
-        print("Criteria updated successfully")
-        
-        # Recalculate eligibility for all students
-        update_all_eligibility()
-        
-        return True
+        return conn.execute(f'''
+            SELECT COUNT(*)
+            FROM users u
+            LEFT JOIN student_profiles sp ON u.id = sp.user_id
+            WHERE {' AND '.join(conditions)}
+        ''', params).fetchone()[0]
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        print(f"Database error during criteria update: {e}")
-        return False
-    except Exception as e:
-        if conn:
-            conn.rollback()
-        print(f"Unexpected error during criteria update: {e}")
-        return False
+        logger.error("Database error: %s", e)
+        return 0
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
 
-def update_all_eligibility():
-    """Update eligibility for all students based on current criteria"""
+def get_eligibility_criteria():
+    """Get current eligibility criteria"""
     conn = None
     try:
         conn = get_db_connection()
         if not conn:
-            return
+            return None
             
-        students = conn.execute('SELECT user_id FROM student_profiles').fetchall()
-        
-        for student in students:
-            check_eligibility(student['user_id'])
+        return _cached_criteria(conn)
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
+        return None
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+CRITERIA_FIELDS = [
+    'min_attendance', 'min_assessment_score', 'min_cgpa',
+    'min_leetcode_problems', 'min_projects', 'require_portfolio',
+    'require_leetcode_profile', 'require_github_profile', 'require_linkedin_profile'
+]
+
+def _save_eligibility_criteria(conn, criteria):
+    # Check if the table has all the necessary columns
+    columns = {col['name'] for col in conn.execute("PRAGMA table_info(eligibility_criteria)")}
+    
+    # Add any missing columns
+    for col_name in ('require_leetcode_profile', 'require_github_profile', 'require_linkedin_profile'):
+        if col_name not in columns:
+            logger.info("Adding missing column: %s", col_name)
+            conn.execute(f"ALTER TABLE eligibility_criteria ADD COLUMN {col_name} INTEGER DEFAULT 0")
+    
+    # The caller logs only the criteria that changed
+    previous = _load_criteria(conn) or {}
+    changed = {field: criteria[field] for field in CRITERIA_FIELDS if previous.get(field) != criteria[field]}
+    
+    values = (
+        criteria['min_attendance'],
+        criteria['min_assessment_score'],
+        criteria['min_cgpa'],
+        criteria['min_leetcode_problems'],
+        criteria['min_projects'],
+        criteria['require_portfolio'],
+        criteria['require_leetcode_profile'],
+        criteria['require_github_profile'],
+        criteria['require_linkedin_profile']
+    )
+    cursor = conn.execute('''
+        UPDATE eligibility_criteria SET
+        min_attendance = ?,
+        min_assessment_score = ?,
+        min_cgpa = ?,
+        min_leetcode_problems = ?,
+        min_projects = ?,
+        require_portfolio = ?,
+        require_leetcode_profile = ?,
+        require_github_profile = ?,
+        require_linkedin_profile = ?
+        WHERE id = 1
+    ''', values)
+    
+    # If no rows were affected, insert a new record
+    if cursor.rowcount == 0:
+        logger.info("No criteria row to update, inserting one")
+        conn.execute('''
+            INSERT OR IGNORE INTO eligibility_criteria 
+            (id, min_attendance, min_assessment_score, min_cgpa, min_leetcode_problems, min_projects, 
+            require_portfolio, require_leetcode_profile, require_github_profile, require_linkedin_profile)
+            VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', values)
+    
+    bump_data_version(conn, 'criteria')
+    
+    # Recalculate eligibility for all students in the same transaction
+    _update_all_eligibility(conn)
+    return changed
+
+def update_eligibility_criteria(criteria):
+    """Update eligibility criteria and recompute every student's eligibility"""
+    # Ensure all required fields are present
+    for field in CRITERIA_FIELDS:
+        if field not in criteria:
+            logger.warning("Missing required criteria field: %s", field)
+            return False
+    
+    try:
+        changed = run_write(_save_eligibility_criteria, criteria)
+    except sqlite3.Error as e:
+        logger.error("Database error during criteria update: %s", e)
+        return False
+    except Exception:
+        logger.exception("Unexpected error during criteria update")
+        return False
+    finally:
+        _settings_cache.invalidate('criteria')
+    if changed:
+        logger.info("Eligibility criteria updated", extra={'changed': changed})
+    else:
+        logger.debug("Eligibility criteria saved without changes")
+    return True
+
+# (name, criteria key, profile column) per eligibility rule. Bit i of a
+# profile's failed_criteria is set when it fails rule i, so 0 means eligible.
+# min_ rules are thresholds; require_ rules need a non-empty profile link
+# while the criterion is on.
+ELIGIBILITY_RULES = [
+    ('attendance', 'min_attendance', 'attendance_percentage'),
+    ('assessment', 'min_assessment_score', 'weekly_assessment_score'),
+    ('cgpa', 'min_cgpa', 'semester_cgpa'),
+    ('leetcode', 'min_leetcode_problems', 'leetcode_problems'),
+    ('projects', 'min_projects', 'project_count'),
+    ('portfolio', 'require_portfolio', 'portfolio_link'),
+    ('leetcode_profile', 'require_leetcode_profile', 'leetcode_profile'),
+    ('github_profile', 'require_github_profile', 'github_profile'),
+    ('linkedin_profile', 'require_linkedin_profile', 'linkedin_profile'),
+]
+
+CRITERION_BITS = {name: 1 << bit for bit, (name, _, _) in enumerate(ELIGIBILITY_RULES)}
+
+# SQL form of failed_criteria(), taking the criteria as named parameters.
+# Missing (NULL) metrics fail their threshold. The bits are disjoint, so the
+# terms are summed, which SQLite evaluates faster than OR-ing them.
+FAILED_CRITERIA_SQL = '(' + ' + '.join(
+    f"CASE WHEN {column} >= :{key} THEN 0 ELSE {1 << bit} END" if key.startswith('min_') else
+    f"CASE WHEN :{key} AND COALESCE({column}, '') = '' THEN {1 << bit} ELSE 0 END"
+    for bit, (_, key, column) in enumerate(ELIGIBILITY_RULES)
+) + ')'
+
+def _update_all_eligibility(conn):
+    criteria = conn.execute('SELECT * FROM eligibility_criteria LIMIT 1').fetchone()
+    if not criteria:
+        return 0
+    
+    # Only rows whose failed criteria or status actually change are written
+    cursor = conn.execute(f"""
+        UPDATE student_profiles
+        SET failed_criteria = {FAILED_CRITERIA_SQL}, is_eligible = {FAILED_CRITERIA_SQL} = 0
+        WHERE failed_criteria IS NOT {FAILED_CRITERIA_SQL} OR is_eligible IS NOT (failed_criteria = 0)
+    """, dict(criteria))
+    if cursor.rowcount:
+        bump_data_version(conn, 'students')
+    return cursor.rowcount
+
+def _update_all_eligibility_flips(conn):
+    criteria = _load_criteria(conn)
+    if not criteria:
+        return 0
+    
+    # Counted before the UPDATE rewrites is_eligible
+    flips = conn.execute(f"""
+        SELECT COUNT(*) FROM student_profiles WHERE is_eligible IS NOT ({FAILED_CRITERIA_SQL} = 0)
+    """, criteria).fetchone()[0]
+    _update_all_eligibility(conn)
+    return flips
+
+def update_all_eligibility(flips_only=False):
+    """Update eligibility for all students based on current criteria
+    
+    Runs as a single set-based UPDATE in one transaction and returns the
+    number of students whose eligibility or failed criteria changed, or
+    with flips_only only those whose eligibility changed.
+    """
+    try:
+        return run_write(_update_all_eligibility_flips if flips_only else _update_all_eligibility)
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", e)
+        return None
+
+def failed_criteria(profile, criteria):
+    """Bitmask of the eligibility rules a single profile fails"""
+    failed = 0
+    for bit, (_, key, column) in enumerate(ELIGIBILITY_RULES):
+        value = profile[column]
+        if key.startswith('min_'):
+            passed = value is not None and value >= criteria[key]
+        else:
+            passed = not criteria[key] or value
+        if not passed:
+            failed |= 1 << bit
+    return failed
+
+def is_profile_eligible(profile, criteria):
+    """Evaluate the eligibility rules for a single profile"""
+    return failed_criteria(profile, criteria) == 0
+
+# Only writes when the stored result changed
+SET_ELIGIBILITY_SQL = """
+    UPDATE student_profiles SET is_eligible = :eligible, failed_criteria = :failed
+    WHERE user_id = :user_id AND (is_eligible IS NOT :eligible OR failed_criteria IS NOT :failed)
+"""
+
+def _check_eligibility(conn, user_id):
+    # A batched write may follow a criteria change in the same transaction,
+    # so the version is always checked
+    criteria = _cached_criteria(conn, revalidate=True)
+    profile = conn.execute(PROFILE_BY_USER_SQL, (user_id,)).fetchone()
+    
+    if not profile or not criteria:
+        return False
+    
+    failed = failed_criteria(profile, criteria)
+    is_eligible = failed == 0
+    
+    # Update eligibility status
+    cursor = conn.execute(SET_ELIGIBILITY_SQL, {'eligible': 1 if is_eligible else 0, 'failed': failed, 'user_id': user_id})
+    if cursor.rowcount:
+        bump_data_version(conn, 'students')
+    return is_eligible
 
 def check_eligibility(user_id):
     """Check if a student meets eligibility criteria"""
+    try:
+        return run_write(_check_eligibility, user_id)
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", e)
+        return False
+
+# failed_criteria values of the students who fail exactly one rule
+NEAR_MISS_MASKS = ', '.join(str(bit) for bit in CRITERION_BITS.values())
+
+# Per department: students with evaluated eligibility, how many are eligible or
+# fail a single rule, and per rule how many fail it and how many fail only it
+FAILURE_COUNTS_SQL = f"""
+    SELECT
+        u.department,
+        COUNT(*) AS students,
+        SUM(sp.failed_criteria = 0) AS eligible,
+        SUM(sp.failed_criteria IN ({NEAR_MISS_MASKS})) AS near_miss,
+        {', '.join(f'SUM((sp.failed_criteria & {bit}) <> 0) AS failing_{name}, '
+                   f'SUM(sp.failed_criteria = {bit}) AS only_{name}'
+                   for name, bit in CRITERION_BITS.items())}
+    FROM student_profiles sp
+    JOIN users u ON u.id = sp.user_id
+    WHERE u.role = 'student' AND sp.failed_criteria IS NOT NULL
+"""
+
+def get_eligibility_failures(department=None):
+    """Count why students are not eligible, per department
+    
+    Each department's dict holds the students whose eligibility has been
+    evaluated, how many are eligible, how many are near misses (failing
+    exactly one rule), and per rule name how many fail it at all ('failing')
+    and how many fail only it ('only').
+    """
     conn = None
     try:
         conn = get_db_connection()
         if not conn:
-            return False
-            
-        criteria = conn.execute('SELECT * FROM eligibility_criteria LIMIT 1').fetchone()
-        profile = conn.execute('SELECT * FROM student_profiles WHERE user_id = ?', (user_id,)).fetchone()
-        
-        if not profile or not criteria:
-            return False
-        
-        # Count projects
-        project_count = len(profile['projects'].split(',')) if profile['projects'] else 0
-        
-        # Check all criteria
-        is_eligible = (
-            profile['attendance_percentage'] >= criteria['min_attendance'] and
-            profile['weekly_assessment_score'] >= criteria['min_assessment_score'] and
-            profile['semester_cgpa'] >= criteria['min_cgpa'] and
-            profile['leetcode_problems'] >= criteria['min_leetcode_problems'] and
-            project_count >= criteria['min_projects'] and
-            (not criteria['require_portfolio'] or profile['portfolio_link']) and
-            (not criteria['require_leetcode_profile'] or profile['leetcode_profile']) and
-            (not criteria['require_github_profile'] or profile['github_profile']) and
-            (not criteria['require_linkedin_profile'] or profile['linkedin_profile'])
-        )
-        
-        # Update eligibility status
-        conn.execute('UPDATE student_profiles SET is_eligible = ? WHERE user_id = ?', 
-                     (1 if is_eligible else 0, user_id))
-        conn.commit()
-        return is_eligible
+            return []
+    
+        sql, params = FAILURE_COUNTS_SQL, []
+        if department:
+            sql += ' AND u.department = ?'
+            params.append(department)
+        rows = conn.execute(sql + ' GROUP BY u.department ORDER BY u.department', params).fetchall()
+        return [
+            {
+                'department': row['department'],
+                'students': row['students'],
+                'eligible': row['eligible'],
+                'near_miss': row['near_miss'],
+                'failing': {name: row[f'failing_{name}'] for name in CRITERION_BITS},
+                'only': {name: row[f'only_{name}'] for name in CRITERION_BITS}
+            }
+            for row in rows
+        ]
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        print(f"Database error: {e}")
-        return False
+        logger.error("Database error: %s", e)
+        return []
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
 
-def approve_student(user_id, approved):
-    """Approve or disapprove a student for placement"""
+def get_near_miss_students(criterion=None, department=None, limit=100):
+    """Students who fail exactly one eligibility rule, or only the named one
+    
+    Each student comes with the rule they fail, their value for it and the
+    value the current criteria require.
+    """
+    if criterion is not None and criterion not in CRITERION_BITS:
+        raise ValueError(f'Unknown criterion: {criterion}')
+    
+    masks = str(CRITERION_BITS[criterion]) if criterion else NEAR_MISS_MASKS
+    conditions, params = [f'sp.failed_criteria IN ({masks})', "u.role = 'student'"], []
+    if department:
+        conditions.append('u.department = ?')
+        params.append(department)
+    params.append(limit)
+    
     conn = None
     try:
         conn = get_db_connection()
         if not conn:
-            return False
-            
-        conn.execute('UPDATE student_profiles SET is_approved = ? WHERE user_id = ?', 
-                     (1 if approved else 0, user_id))
-        conn.commit()
-        return True
+            return []
+    
+        criteria = _cached_criteria(conn) or {}
+        rows = conn.execute(f'''
+            SELECT u.id, u.username, u.email, u.department, sp.failed_criteria,
+                   {', '.join(f'sp.{column}' for _, _, column in ELIGIBILITY_RULES)}
+            FROM student_profiles sp
+            JOIN users u ON u.id = sp.user_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY sp.failed_criteria, u.username
+            LIMIT ?
+        ''', params).fetchall()
+    
+        students = []
+        for row in rows:
+            name, key, column = ELIGIBILITY_RULES[row['failed_criteria'].bit_length() - 1]
+            students.append({
+                'id': row['id'],
+                'username': row['username'],
+                'email': row['email'],
+                'department': row['department'],
+                'failing': name,
+                'value': row[column],
+                'required': criteria.get(key)
+            })
+        return students
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        print(f"Database error: {e}")
-        return False
+        logger.error("Database error: %s", e)
+        return []
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+SET_APPROVAL_SQL = 'UPDATE student_profiles SET is_approved = ? WHERE user_id = ?'
+
+def _approve_student(conn, user_id, approved):
+    conn.execute(SET_APPROVAL_SQL, (1 if approved else 0, user_id))
+    bump_data_version(conn, 'students')
+    return True
+
+def approve_student(user_id, approved):
+    """Approve or disapprove a student for placement"""
+    try:
+        return run_write(_approve_student, user_id, approved)
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", e)
+        return False
+
+def approval_update_sql(approved, user_ids=None, filters=None):
+    """Build the UPDATE behind set_students_approval, as (sql, params)"""
+    if user_ids is None and filters is None:
+        raise ValueError('Give student ids or filters')
+    
+    value = 1 if approved else 0
+    conditions, params = ['is_approved IS NOT ?'], [value]
+    if user_ids is not None:
+        # One parameter however many ids are selected
+        conditions.append('user_id IN (SELECT value FROM json_each(?))')
+        params.append(json.dumps([int(user_id) for user_id in user_ids]))
+    if filters is not None:
+        filter_conditions, filter_params = _student_filter_sql(filters)
+        conditions.append(f'''user_id IN (
+            SELECT u.id
+            FROM users u
+            LEFT JOIN student_profiles sp ON u.id = sp.user_id
+            WHERE {' AND '.join(filter_conditions)}
+        )''')
+        params.extend(filter_params)
+    
+    return f"UPDATE student_profiles SET is_approved = ? WHERE {' AND '.join(conditions)}", [value] + params
+
+def set_students_approval(approved, user_ids=None, filters=None):
+    """Approve or disapprove many students in one transaction
+    
+    Targets the given user ids, the students matching the roster filters, or
+    the students matching both when both are given. Returns the number of
+    students whose approval changed, or None on error.
+    """
+    sql, params = approval_update_sql(approved, user_ids, filters)
+    try:
+        return run_write(_update_approval, sql, params)
+    except sqlite3.Error as e:
+        logger.error("Database error: %s", e)
+        return None
+
+def _update_approval(conn, sql, params):
+    cursor = conn.execute(sql, params)
+    if cursor.rowcount:
+        bump_data_version(conn, 'students')
+    return cursor.rowcount
 
 def get_admin_key():
     """Get the admin key for registration"""
@@ -548,124 +1670,222 @@ def get_admin_key():
         if not conn:
             return None
             
-        admin_key = conn.execute('SELECT admin_key FROM admin_settings WHERE id = 1').fetchone()
-        return admin_key['admin_key'] if admin_key else None
+        settings = _cached_admin_settings(conn)
+        return settings['admin_key'] if settings else None
     except sqlite3.Error as e:
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return None
     finally:
-        if conn:
-            conn.close()
+        release_db_connection(conn)
+
+def _save_admin_key(conn, new_key):
+    conn.execute('UPDATE admin_settings SET admin_key = ? WHERE id = 1', (new_key,))
+    bump_data_version(conn, 'admin_settings')
+    return True
 
 def update_admin_key(new_key):
     """Update the admin key"""
-    conn = None
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False
-            
-        conn.execute('UPDATE admin_settings SET admin_key = ? WHERE id = 1', (new_key,))
-        conn.commit()
-        return True
+        return run_write(_save_admin_key, new_key)
     except sqlite3.Error as e:
-        if conn:
-            conn.rollback()
-        print(f"Database error: {e}")
+        logger.error("Database error: %s", e)
         return False
     finally:
-        if conn:
-            conn.close()
+        _settings_cache.invalidate('admin_settings')
 
-def export_eligible_students_to_excel():
-    """Export eligible students' data to Excel file"""
-    conn = None
+# Query for the eligible-student exports
+EXPORT_QUERY = """
+    SELECT 
+        u.id, 
+        u.username, 
+        u.email, 
+        u.department, 
+        u.specialization, 
+        sp.semester_cgpa, 
+        sp.domain_specialization, 
+        sp.skills, 
+        sp.leetcode_problems, 
+        sp.leetcode_profile, 
+        sp.github_profile, 
+        sp.linkedin_profile, 
+        sp.portfolio_link, 
+        sp.is_approved
+    FROM users u
+    JOIN student_profiles sp ON u.id = sp.user_id
+    WHERE sp.is_eligible = 1 AND u.role = 'student'
+"""
+
+# (header, query column, converter) for every exported field
+EXPORT_COLUMNS = [
+    ('ID', 'id', None),
+    ('Username', 'username', None),
+    ('Email', 'email', None),
+    ('Department', 'department', None),
+    ('Specialization', 'specialization', None),
+    ('CGPA', 'semester_cgpa', None),
+    ('Domain Specialization', 'domain_specialization', None),
+    ('Skills', 'skills', None),
+    ('LeetCode Problems', 'leetcode_problems', None),
+    ('LeetCode Profile', 'leetcode_profile', None),
+    ('GitHub Profile', 'github_profile', None),
+    ('LinkedIn Profile', 'linkedin_profile', None),
+    ('Portfolio Link', 'portfolio_link', None),
+    ('Approved', 'is_approved', lambda value: 'Yes' if value else 'No'),
+]
+EXPORT_HEADERS = [header for header, _, _ in EXPORT_COLUMNS]
+
+# Parquet types of the non-text export columns
+EXPORT_PARQUET_TYPES = {
+    'id': 'int64',
+    'semester_cgpa': 'float64',
+    'leetcode_problems': 'int64',
+}
+
+# Rows per chunk of a streamed export and per Parquet row group
+EXPORT_CHUNK_ROWS = 1000
+PARQUET_ROW_GROUP_ROWS = 10000
+
+def iter_export_rows(conn):
+    """Yield eligible students as export rows straight from the cursor"""
+    for student in conn.execute(EXPORT_QUERY):
+        yield [
+            convert(student[column]) if convert else student[column]
+            for _, column, convert in EXPORT_COLUMNS
+        ]
+
+def iter_export_batches(size=EXPORT_CHUNK_ROWS, progress=None):
+    """Yield lists of up to size export rows
+    
+    The connection is only held while the generator is being consumed, so a
+    streamed response reads from its own pooled connection after the request
+    has been torn down. progress, if given, is called with the number of rows
+    in each batch.
+    """
+    conn = get_db_connection()
     try:
-        print("Starting export to Excel process")
-        conn = get_db_connection()
-        if not conn:
-            print("Failed to get database connection")
-            return None
-        
-        # Get eligible students with all required fields - using a safer query
-        query = """
-            SELECT 
-                u.id, 
-                u.username, 
-                u.email, 
-                u.department, 
-                u.specialization, 
-                sp.semester_cgpa, 
-                sp.domain_specialization, 
-                sp.skills, 
-                sp.leetcode_problems, 
-                sp.leetcode_profile, 
-                sp.github_profile, 
-                sp.linkedin_profile, 
-                sp.portfolio_link, 
-                sp.is_approved
-            FROM users u
-            JOIN student_profiles sp ON u.id = sp.user_id
-            WHERE sp.is_eligible = 1 AND u.role = 'student'
-        """
-        
-        students = conn.execute(query).fetchall()
-        print(f"Retrieved {len(students)} eligible students from the database")
-        
-        if not students or len(students) == 0:
-            print("No eligible students data retrieved")
-            return None
-        
-        # Create Excel file
-        students_list = []
-        for student in students:
-            student_dict = dict(student)
-            students_list.append({
-                'ID': student_dict.get('id'),
-                'Username': student_dict.get('username'),
-                'Email': student_dict.get('email'),
-                'Department': student_dict.get('department', ''),
-                'Specialization': student_dict.get('specialization', ''),
-                'CGPA': student_dict.get('semester_cgpa', 0),
-                'Domain Specialization': student_dict.get('domain_specialization', ''),
-                'Skills': student_dict.get('skills', ''),
-                'LeetCode Problems': student_dict.get('leetcode_problems', 0),
-                'LeetCode Profile': student_dict.get('leetcode_profile', ''),
-                'GitHub Profile': student_dict.get('github_profile', ''),
-                'LinkedIn Profile': student_dict.get('linkedin_profile', ''),
-                'Portfolio Link': student_dict.get('portfolio_link', ''),
-                'Approved': 'Yes' if student_dict.get('is_approved') else 'No'
-            })
-        
-        # Import pandas inside the function to avoid loading it unnecessarily
-        import pandas as pd
-        import io
-        
-        df = pd.DataFrame(students_list)
-        
-        # Create Excel file in memory
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Eligible Students', index=False)
-            
-            # Auto-adjust columns' width
-            worksheet = writer.sheets['Eligible Students']
-            for i, col in enumerate(df.columns):
-                # Get the maximum length in the column
-                max_len = max(df[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, max_len)
-        
-        output.seek(0)
-        print("Excel file generated successfully")
-        return output
+        rows = iter_export_rows(conn)
+        while True:
+            batch = list(itertools.islice(rows, size))
+            if not batch:
+                return
+            if progress:
+                progress(len(batch))
+            yield batch
+    finally:
+        release_db_connection(conn)
+
+def iter_export_csv(progress=None):
+    """Yield the eligible students as CSV text, one chunk per batch of rows"""
+    import csv
+    import io
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    yield buffer.getvalue()
+    for batch in iter_export_batches(progress=progress):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+def iter_export_ndjson(progress=None):
+    """Yield the eligible students as newline-delimited JSON, one chunk per batch of rows"""
+    for batch in iter_export_batches(progress=progress):
+        yield ''.join(json.dumps(dict(zip(EXPORT_HEADERS, row))) + '\n' for row in batch)
+
+def write_parquet_export(output, progress=None):
+    """Write the eligible students to a binary file as Parquet
+    
+    Rows are written in row groups of PARQUET_ROW_GROUP_ROWS. Returns the
+    number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        (header, EXPORT_PARQUET_TYPES.get(column, 'string'))
+        for header, column, _ in EXPORT_COLUMNS
+    ])
+    row_count = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        for batch in iter_export_batches(PARQUET_ROW_GROUP_ROWS, progress):
+            columns = [list(values) for values in zip(*batch)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            row_count += len(batch)
+    return row_count
+
+def write_excel_export(output, progress=None):
+    """Write the eligible students to a binary file as an Excel workbook
+    
+    Rows are streamed from the cursor into an xlsxwriter workbook in
+    constant_memory mode. Returns the number of rows written.
+    """
+    import xlsxwriter
+    
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Eligible Students')
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+    
+    # Column widths are tracked as rows go by
+    widths = [len(header) for header in EXPORT_HEADERS]
+    worksheet.write_row(0, 0, EXPORT_HEADERS, header_format)
+    
+    row_count = 0
+    for batch in iter_export_batches(progress=progress):
+        for row in batch:
+            row_count += 1
+            worksheet.write_row(row_count, 0, row)
+            for i, value in enumerate(row):
+                if value is not None:
+                    widths[i] = max(widths[i], len(str(value)))
+    
+    # The column layout is written when the workbook is closed
+    for i, width in enumerate(widths):
+        worksheet.set_column(i, i, width + 2)
+    workbook.close()
+    return row_count
+
+def _export_to_tempfile(write, suffix):
+    """Run an export writer into an anonymous temporary file
+    
+    Returns the file positioned at the start, or None if there is nothing to
+    export or the export failed.
+    """
+    import tempfile
     
+    output = tempfile.TemporaryFile(suffix=suffix)
+    try:
+        row_count = write(output)
     except sqlite3.Error as e:
-        print(f"Database error during Excel export: {e}")
+        logger.error("Database error during export: %s", e)
+        output.close()
         return None
     except Exception as e:
-        print(f"Error in Excel export: {e}")
-        print(f"Error details: {str(e)}")
+        logger.exception("Error in export")
+        output.close()
         return None
-    finally:
-        if conn:
-            conn.close() 
\ No newline at end of file
+    
+    logger.info("Exported eligible students", extra={'rows': row_count, 'format': suffix.lstrip('.')})
+    if row_count == 0:
+        output.close()
+        return None
+    
+    output.seek(0)
+    return output
+
+def export_eligible_students_to_parquet():
+    """Export eligible students' data to a Parquet file
+    
+    Returns an anonymous temporary file positioned at the start, or None if
+    there is nothing to export.
+    """
+    return _export_to_tempfile(write_parquet_export, '.parquet')
+
+def export_eligible_students_to_excel():
+    """Export eligible students' data to Excel file
+    
+    Returns an anonymous temporary file positioned at the start, or None if
+    there is nothing to export.
+    """
+    return _export_to_tempfile(write_excel_export, '.xlsx')
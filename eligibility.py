@@ -0,0 +1,259 @@
+"""Vectorized eligibility evaluation for the whole cohort
+
+The cohort's eligibility inputs are loaded into NumPy arrays once and every
+rule is evaluated as a boolean mask, instead of calling
+database.is_profile_eligible row by row. Missing (NULL) metrics never meet a
+threshold, matching database.FAILED_CRITERIA_SQL.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# Column order of the array returned by the metrics query
+METRICS_QUERY = '''
+    SELECT
+        user_id,
+        attendance_percentage,
+        weekly_assessment_score,
+        semester_cgpa,
+        leetcode_problems,
+        project_count,
+        COALESCE(portfolio_link, '') <> '',
+        COALESCE(leetcode_profile, '') <> '',
+        COALESCE(github_profile, '') <> '',
+        COALESCE(linkedin_profile, '') <> '',
+        COALESCE(is_eligible, 0),
+        COALESCE(failed_criteria, -1)
+    FROM student_profiles
+    ORDER BY user_id
+'''
+
+# (criteria key, metric attribute) pairs for the numeric thresholds
+THRESHOLDS = [
+    ('min_attendance', 'attendance'),
+    ('min_assessment_score', 'assessment'),
+    ('min_cgpa', 'cgpa'),
+    ('min_leetcode_problems', 'leetcode'),
+    ('min_projects', 'projects'),
+]
+
+# (criteria key, presence flag attribute) pairs for the required profile links
+REQUIRED_LINKS = [
+    ('require_portfolio', 'has_portfolio'),
+    ('require_leetcode_profile', 'has_leetcode_profile'),
+    ('require_github_profile', 'has_github_profile'),
+    ('require_linkedin_profile', 'has_linkedin_profile'),
+]
+
+THRESHOLD_ATTRIBUTES = dict(THRESHOLDS)
+LINK_ATTRIBUTES = dict(REQUIRED_LINKS)
+
+class CohortMetrics:
+    """Eligibility inputs for every student profile, one array per metric"""
+
+    def __init__(self, data):
+        data = np.asarray(data, dtype=np.float64).reshape(-1, 12)
+        self.user_ids = data[:, 0].astype(np.int64)
+        self.attendance = data[:, 1]
+        self.assessment = data[:, 2]
+        self.cgpa = data[:, 3]
+        self.leetcode = data[:, 4]
+        self.projects = data[:, 5]
+        self.has_portfolio = data[:, 6] == 1
+        self.has_leetcode_profile = data[:, 7] == 1
+        self.has_github_profile = data[:, 8] == 1
+        self.has_linkedin_profile = data[:, 9] == 1
+        self.is_eligible = data[:, 10] == 1
+        self.failed_criteria = data[:, 11].astype(np.int64)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @classmethod
+    def load(cls, conn):
+        """Read the cohort's metrics with a single query"""
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # NULL metrics become NaN, which fails every comparison
+        return cls(cursor.execute(METRICS_QUERY).fetchall())
+
+    def evaluate(self, criteria):
+        """Boolean mask of the students who meet the criteria"""
+        mask = np.ones(len(self), dtype=bool)
+        for key, attribute in THRESHOLDS:
+            mask &= getattr(self, attribute) >= criteria[key]
+        for key, attribute in REQUIRED_LINKS:
+            if criteria[key]:
+                mask &= getattr(self, attribute)
+        return mask
+
+    def failures(self, criteria):
+        """Bitmask of the rules each student fails, as in database.failed_criteria"""
+        failed = np.zeros(len(self), dtype=np.int64)
+        for bit, (_, key, _) in enumerate(db.ELIGIBILITY_RULES):
+            if key in THRESHOLD_ATTRIBUTES:
+                failing = ~(getattr(self, THRESHOLD_ATTRIBUTES[key]) >= criteria[key])
+            elif criteria[key]:
+                failing = ~getattr(self, LINK_ATTRIBUTES[key])
+            else:
+                continue
+            failed[failing] |= 1 << bit
+        return failed
+
+    def apply(self, conn, criteria):
+        """Write back the students whose eligibility or failed rules changed and return how many did
+
+        A transaction body for database.run_write: the caller's transaction
+        commits the writes.
+        """
+        failed = self.failures(criteria)
+        eligible = failed == 0
+        changed = np.flatnonzero((eligible != self.is_eligible) | (failed != self.failed_criteria))
+        if len(changed):
+            conn.executemany(
+                'UPDATE student_profiles SET is_eligible = ?, failed_criteria = ? WHERE user_id = ?',
+                zip(eligible[changed].astype(int).tolist(), failed[changed].tolist(),
+                    self.user_ids[changed].tolist())
+            )
+            db.bump_data_version(conn, 'students')
+        self.is_eligible = eligible
+        self.failed_criteria = failed
+        return len(changed)
+
+def _recompute_eligibility(conn):
+    criteria = conn.execute('SELECT * FROM eligibility_criteria LIMIT 1').fetchone()
+    if not criteria:
+        return 0
+    # Loaded inside the write transaction, so no save can land in between
+    return CohortMetrics.load(conn).apply(conn, dict(criteria))
+
+def recompute_eligibility():
+    """Recompute the whole cohort's eligibility with the current criteria
+
+    Runs through database.run_write, so in write-queue mode it is committed
+    by the writer thread. Returns the number of students whose status
+    changed, or None on error.
+    """
+    try:
+        return db.run_write(_recompute_eligibility)
+    except sqlite3.Error as e:
+        logger.error("Database error during eligibility recomputation: %s", e)
+        return None
+
+# How long a preview index may be reused before it is rebuilt from the database
+PREVIEW_MAX_AGE = 30.0
+
+class CriteriaPreview:
+    """Read-only "what-if" evaluation of candidate criteria
+
+    Holds the cohort's metrics in memory together with sorted copies of each
+    numeric metric, so previews never touch student_profiles.
+    """
+
+    def __init__(self, metrics, usernames, departments):
+        self.metrics = metrics
+        self.usernames = list(usernames)
+        self.department_names, self.department_codes = np.unique(
+            np.asarray([d or '' for d in departments], dtype=object).astype(str), return_inverse=True
+        )
+        # Sorted non-missing values answer "how many pass this threshold" by bisection
+        self.sorted_metrics = {}
+        for key, attribute in THRESHOLDS:
+            values = getattr(metrics, attribute)
+            self.sorted_metrics[key] = np.sort(values[~np.isnan(values)])
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, conn):
+        """Read the metrics and the matching names in one read transaction"""
+        started = not conn.in_transaction
+        if started:
+            conn.execute('BEGIN')
+        try:
+            metrics = CohortMetrics.load(conn)
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute('''
+                SELECT u.username, u.department
+                FROM student_profiles sp
+                LEFT JOIN users u ON u.id = sp.user_id
+                ORDER BY sp.user_id
+            ''').fetchall()
+        finally:
+            if started:
+                conn.rollback()
+        return cls(metrics, [row[0] for row in rows], [row[1] for row in rows])
+
+    def passing_counts(self, criteria):
+        """Number of students meeting each numeric threshold on its own"""
+        return {
+            key: int(len(values) - np.searchsorted(values, criteria[key], side='left'))
+            for key, values in self.sorted_metrics.items()
+        }
+
+    def _students(self, indexes, limit):
+        return [
+            {
+                'id': int(self.metrics.user_ids[i]),
+                'username': self.usernames[i],
+                'department': str(self.department_names[self.department_codes[i]])
+            }
+            for i in indexes[:limit]
+        ]
+
+    def preview(self, criteria, limit=20):
+        """Summarize who would be eligible under the candidate criteria"""
+        eligible = self.metrics.evaluate(criteria)
+        current = self.metrics.is_eligible
+        gained = np.flatnonzero(eligible & ~current)
+        lost = np.flatnonzero(~eligible & current)
+
+        departments = len(self.department_names)
+        eligible_by_department = np.bincount(self.department_codes[eligible], minlength=departments)
+        current_by_department = np.bincount(self.department_codes[current], minlength=departments)
+        total_by_department = np.bincount(self.department_codes, minlength=departments)
+
+        return {
+            'total': len(self.metrics),
+            'eligible': int(eligible.sum()),
+            'currently_eligible': int(current.sum()),
+            'by_department': {
+                str(name) or 'Unassigned': {
+                    'total': int(total_by_department[i]),
+                    'eligible': int(eligible_by_department[i]),
+                    'currently_eligible': int(current_by_department[i])
+                }
+                for i, name in enumerate(self.department_names)
+            },
+            'passing_by_criterion': self.passing_counts(criteria),
+            'gained': {'count': len(gained), 'students': self._students(gained, limit)},
+            'lost': {'count': len(lost), 'students': self._students(lost, limit)}
+        }
+
+_preview = None
+_preview_lock = threading.Lock()
+
+def get_criteria_preview(max_age=PREVIEW_MAX_AGE):
+    """Get the in-memory preview index, rebuilding it once it is older than max_age"""
+    global _preview
+    with _preview_lock:
+        if _preview is None or time.monotonic() - _preview.loaded_at > max_age:
+            conn = db.get_db_connection()
+            try:
+                _preview = CriteriaPreview.load(conn)
+            finally:
+                db.release_db_connection(conn)
+        return _preview
+
+def invalidate_preview():
+    """Drop the preview index so the next preview reloads it"""
+    global _preview
+    with _preview_lock:
+        _preview = None
@@ -0,0 +1,345 @@
+"""Background export jobs and the export cache
+
+Exports run on a small local thread pool and are written to an artifact
+directory under the system temp dir, so a large export neither ties up a
+request worker nor runs into proxy timeouts. Finished artifacts are removed
+once they are older than EXPORT_ARTIFACT_TTL.
+
+Finished exports are also kept in an ExportCache keyed by the data version
+and format, so repeated exports of unchanged data are served from disk.
+"""
+import atexit
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# Worker pool size, how many jobs may be queued or running at once, and how
+# long a finished artifact is kept (overridable via environment)
+EXPORT_WORKERS = int(os.environ.get('PLACEMENT_EXPORT_WORKERS', 2))
+EXPORT_MAX_PENDING = int(os.environ.get('PLACEMENT_EXPORT_MAX_PENDING', 8))
+EXPORT_ARTIFACT_TTL = float(os.environ.get('PLACEMENT_EXPORT_TTL', 900))
+
+# Total size of the cached export files
+EXPORT_CACHE_BYTES = int(os.environ.get('PLACEMENT_EXPORT_CACHE_BYTES', 256 * 1024 * 1024))
+
+# Export formats: (file extension, mimetype, chunk generator, file writer).
+# Streamed formats have a chunk generator, the others write a binary file.
+EXPORT_FORMATS = {
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', None, db.write_excel_export),
+    'parquet': ('parquet', 'application/vnd.apache.parquet', None, db.write_parquet_export),
+    'csv': ('csv', 'text/csv', db.iter_export_csv, None),
+    'ndjson': ('ndjson', 'application/x-ndjson', db.iter_export_ndjson, None),
+}
+
+def export_filename(export_format, created=None):
+    """Download name of an export, stamped with its creation time"""
+    created = datetime.datetime.fromtimestamp(created) if created else datetime.datetime.now()
+    return f'eligible_students_{created.strftime("%Y%m%d_%H%M%S")}.{EXPORT_FORMATS[export_format][0]}'
+
+def export_etag(key):
+    """ETag of the export for a (data version, format) key"""
+    return '{}-{}'.format(*key)
+
+class ExportCache:
+    """Finished export files keyed by (data version, format)
+
+    Files are evicted least recently used first once their total size goes
+    over max_bytes.
+    """
+
+    def __init__(self, max_bytes=EXPORT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = tempfile.mkdtemp(prefix='placement_export_cache_')
+        self.entries = OrderedDict()  # key -> (path, size)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def open(self, key):
+        """Open a cached export for reading, or return None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            # An open file stays readable even if it is evicted meanwhile
+            return open(entry[0], 'rb')
+
+    def put(self, key, path):
+        """Move a finished export file into the cache
+
+        Returns False, leaving the file where it is, if it is larger than the
+        whole cache.
+        """
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            return False
+        target = os.path.join(self.directory, export_etag(key))
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous:
+                self.size -= previous[1]
+            os.replace(path, target)
+            self.entries[key] = (target, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (evicted_path, evicted_size) = self.entries.popitem(last=False)
+                os.remove(evicted_path)
+                self.size -= evicted_size
+                self.evictions += 1
+        return True
+
+    def _partial_file(self):
+        fd, path = tempfile.mkstemp(prefix='partial-', dir=self.directory)
+        return os.fdopen(fd, 'wb'), path
+
+    def build(self, key, write):
+        """Run an export writer into a new cache entry
+
+        Returns the export opened for reading, or None if it has no rows.
+        """
+        output, path = self._partial_file()
+        try:
+            with output:
+                row_count = write(output)
+            if row_count == 0:
+                os.remove(path)
+                return None
+            export = open(path, 'rb')
+        except BaseException:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        if not self.put(key, path):
+            os.remove(path)
+        return export
+
+    def tee(self, key, chunks):
+        """Pass streamed chunks through, caching them once the stream completes"""
+        output, path = self._partial_file()
+        complete = False
+        try:
+            with output:
+                for chunk in chunks:
+                    output.write(chunk.encode())
+                    yield chunk
+            complete = True
+        finally:
+            if not (complete and self.put(key, path)) and os.path.exists(path):
+                os.remove(path)
+
+    def stats(self):
+        """Get cache size and hit-rate counters"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'size': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+    def clear(self):
+        """Drop every cached export"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class ExportJob:
+    """One export and its progress"""
+
+    def __init__(self, export_format, version):
+        self.id = uuid.uuid4().hex
+        self.format = export_format
+        self.version = version
+        self.status = 'queued'
+        self.total_rows = None
+        self.rows_written = 0
+        self.path = None
+        self.cached = False
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def key(self):
+        return (self.version, self.format)
+
+    @property
+    def filename(self):
+        return export_filename(self.format, self.created_at)
+
+    @property
+    def mimetype(self):
+        return EXPORT_FORMATS[self.format][1]
+
+    def advance(self, rows):
+        self.rows_written += rows
+
+    def to_dict(self):
+        if self.status == 'done':
+            progress = 1.0
+        elif self.total_rows:
+            progress = min(self.rows_written / self.total_rows, 1.0)
+        else:
+            progress = 0.0
+        return {
+            'id': self.id,
+            'format': self.format,
+            'status': self.status,
+            'rows_written': self.rows_written,
+            'total_rows': self.total_rows,
+            'progress': round(progress, 3),
+            'filename': self.filename,
+            'error': self.error
+        }
+
+class ExportJobManager:
+    """Runs export jobs on a bounded worker pool and keeps their artifacts"""
+
+    def __init__(self, cache, workers=EXPORT_WORKERS, max_pending=EXPORT_MAX_PENDING, ttl=EXPORT_ARTIFACT_TTL):
+        self.cache = cache
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.directory = tempfile.mkdtemp(prefix='placement_exports_')
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, export_format):
+        """Queue an export and return its job
+
+        An export of the same data and format that is already queued or
+        running is reused, and one that is already cached finishes at once.
+        Raises RuntimeError when max_pending jobs are already queued or running.
+        """
+        self.cleanup()
+        job = ExportJob(export_format, db.get_export_version())
+        with self.lock:
+            pending = [item for item in self.jobs.values() if item.status in ('queued', 'running')]
+            for item in pending:
+                if item.key == job.key:
+                    return item
+            if job.key in self.cache:
+                job.status = 'done'
+                job.cached = True
+                job.finished_at = time.time()
+                self.jobs[job.id] = job
+                return job
+            if len(pending) >= self.max_pending:
+                raise RuntimeError('Too many exports in progress, try again shortly')
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """Look up a job that has not expired yet"""
+        self.cleanup()
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def open(self, job):
+        """Open a finished job's file for reading, or return None if it is gone"""
+        if job.cached:
+            return self.cache.open(job.key)
+        try:
+            return open(job.path, 'rb')
+        except OSError:
+            return None
+
+    def _run(self, job):
+        _, _, stream, write = EXPORT_FORMATS[job.format]
+        path = os.path.join(self.directory, f'{job.id}.{EXPORT_FORMATS[job.format][0]}')
+        job.status = 'running'
+        try:
+            job.total_rows = db.count_students({'eligible': True})
+            with open(path, 'wb') as output:
+                if stream:
+                    for chunk in stream(progress=job.advance):
+                        output.write(chunk.encode())
+                else:
+                    write(output, progress=job.advance)
+        except Exception as e:
+            logger.exception("Export job failed", extra={'job_id': job.id, 'format': job.format})
+            if os.path.exists(path):
+                os.remove(path)
+            job.error = str(e)
+            job.status = 'failed'
+        else:
+            if job.rows_written == 0:
+                # Like /admin/export_excel, an export needs eligible students
+                os.remove(path)
+                job.error = 'No eligible students to export'
+                job.status = 'failed'
+            else:
+                if self.cache.put(job.key, path):
+                    job.cached = True
+                else:
+                    job.path = path
+                job.status = 'done'
+        job.finished_at = time.time()
+
+    def cleanup(self):
+        """Forget finished jobs older than the TTL and delete their artifacts"""
+        now = time.time()
+        with self.lock:
+            expired = [
+                job for job in self.jobs.values()
+                if job.finished_at is not None and now - job.finished_at > self.ttl
+            ]
+            for job in expired:
+                del self.jobs[job.id]
+        for job in expired:
+            if job.path and os.path.exists(job.path):
+                os.remove(job.path)
+
+    def shutdown(self):
+        """Stop the workers and remove every artifact"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+_cache = None
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_export_cache():
+    """Get the process-wide export cache, creating it on first use"""
+    global _cache
+    with _manager_lock:
+        if _cache is None:
+            _cache = ExportCache()
+            atexit.register(_cache.clear)
+        return _cache
+
+def get_export_jobs():
+    """Get the process-wide export job manager, creating it on first use"""
+    global _manager
+    cache = get_export_cache()
+    with _manager_lock:
+        if _manager is None:
+            _manager = ExportJobManager(cache)
+            atexit.register(_manager.shutdown)
+        return _manager
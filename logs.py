@@ -0,0 +1,191 @@
+"""Structured, non-blocking logging
+
+Log calls only put the record on a bounded queue; a background thread
+formats it as one JSON object per line and writes it out, so request
+threads never wait on the output stream. When the queue is full records are
+dropped and counted rather than blocking. Records carry the current
+request's ID and the time since the request started, and every request
+ends with an access record holding its latency breakdown.
+
+High-frequency events are logged with extra={'sample': True}; those at
+DEBUG and INFO are kept at the rate configured for their level, while
+warnings and errors are always kept.
+"""
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import uuid
+
+import metrics
+
+# Minimum level and how many records may wait for the writer (overridable via
+# environment)
+LOG_LEVEL = os.environ.get('PLACEMENT_LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.environ.get('PLACEMENT_LOG_QUEUE_SIZE', 10000))
+
+# Share of sampled records kept per level
+LOG_SAMPLE_RATES = {
+    logging.DEBUG: float(os.environ.get('PLACEMENT_LOG_SAMPLE_DEBUG', 0.1)),
+    logging.INFO: float(os.environ.get('PLACEMENT_LOG_SAMPLE_INFO', 1.0)),
+}
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+# LogRecord attributes that are not extra fields
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class ContextFilter(logging.Filter):
+    """Drop unsampled records and stamp the rest with the request's context
+
+    Runs on the thread that logs, before the record is queued.
+    """
+
+    def filter(self, record):
+        if getattr(record, 'sample', False):
+            rate = LOG_SAMPLE_RATES.get(record.levelno, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+            record.sample_rate = rate
+            del record.sample
+        record.request_id = request_id.get()
+        timer = metrics.current_timer()
+        if timer is not None and not hasattr(record, 'elapsed_ms'):
+            record.elapsed_ms = round(timer.total() * 1000, 3)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+                  .isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.levelno >= logging.WARNING:
+            entry['func'] = record.funcName
+            entry['line'] = record.lineno
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of waiting when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.addFilter(ContextFilter())
+
+    def prepare(self, record):
+        # Resolve the message and traceback here, since args and exc_info
+        # may not survive until the writer thread gets to the record
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_handler = None
+_listener = None
+_lock = threading.Lock()
+
+def configure(level=None, stream=None):
+    """Route the root logger through the queue to a JSON writer thread
+
+    Logs go to stderr by default. Calling it again only changes the level.
+    """
+    global _handler, _listener
+    root = logging.getLogger()
+    root.setLevel(level or LOG_LEVEL)
+    with _lock:
+        if _handler is not None:
+            return
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JsonFormatter())
+        _handler = NonBlockingQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output)
+        _listener.start()
+        # Stopping the listener writes out whatever is still queued
+        atexit.register(_listener.stop)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+
+def get_stats():
+    """Records dropped because the queue was full, and the current queue length"""
+    if _handler is None:
+        return {'dropped': 0, 'queued': 0}
+    return {'dropped': _handler.dropped, 'queued': _handler.queue.qsize()}
+
+_access_log = logging.getLogger('placement.access')
+
+def _start_request():
+    from flask import g, request
+
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g._request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+    g._request_id_token = request_id.set(g._request_id)
+
+def _finish_request(response):
+    from flask import g, request
+
+    response.headers[REQUEST_ID_HEADER] = g.get('_request_id', '')
+    timer = metrics.current_timer()
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'sample': True,
+    }
+    if timer is not None:
+        fields['latency_ms'] = round(timer.total() * 1000, 3)
+        fields['db_ms'] = round(timer.db * 1000, 3)
+        fields['template_ms'] = round(timer.template * 1000, 3)
+        fields['elapsed_ms'] = fields['latency_ms']
+    _access_log.info('%s %s %s', request.method, request.path, response.status_code, extra=fields)
+    return response
+
+def _end_request(exception=None):
+    from flask import g
+
+    token = g.pop('_request_id_token', None)
+    if token is not None:
+        request_id.reset(token)
+
+def init_app(app):
+    """Configure logging and give every request of a Flask app an ID and an access record
+
+    The ID is taken from an incoming X-Request-ID header when it looks sane
+    and is echoed back in the response.
+    """
+    configure()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
@@ -0,0 +1,325 @@
+"""Per-request timing and latency metrics
+
+Each request's wall time is split into time spent in SQLite (statements,
+fetches and commits on pooled connections), in template rendering, and the
+rest, which is the Python work of the view. The split is sent back in a
+Server-Timing header, and the latency of the last METRICS_WINDOW requests
+per endpoint is kept for rolling p50/p95/p99, served in the Prometheus text
+format by render_prometheus().
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import jinja2
+
+import sqltrace
+
+# Requests per endpoint kept for the rolling percentiles (overridable via
+# environment)
+METRICS_WINDOW = int(os.environ.get('PLACEMENT_METRICS_WINDOW', 1024))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_local = threading.local()
+
+class RequestTimer:
+    """Time spent in each part of one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.db_calls = 0
+        self.template = 0.0
+        # Filled in when SQL tracing is on
+        self.statements = 0
+        self.queries = {}
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+def current_timer():
+    """The timer of the request running on this thread, or None"""
+    return getattr(_local, 'timer', None)
+
+def _observing():
+    return sqltrace.SQL_TRACE or getattr(_local, 'timer', None) is not None
+
+def _observe(cursor, conn, start, rows=0, statement=None):
+    """Count a cursor or connection call that started at start as DB time
+
+    statement is (sql, parameters) for calls that run a statement.
+    """
+    elapsed = time.perf_counter() - start
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.db += elapsed
+        if statement is not None:
+            timer.db_calls += 1
+    if sqltrace.SQL_TRACE:
+        sqltrace.get_trace().observe(cursor, conn, elapsed, rows, statement, timer)
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor whose statements and fetches count towards the request's DB time"""
+
+    def execute(self, sql, parameters=()):
+        if not _observing():
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe(self, self.connection, start, statement=(sql, parameters))
+
+    def executemany(self, sql, parameters):
+        if not _observing():
+            return super().executemany(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            _observe(self, self.connection, start, statement=(sql, None))
+
+    def executescript(self, sql_script):
+        if not _observing():
+            return super().executescript(sql_script)
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _observe(self, self.connection, start, statement=(sql_script, None))
+
+    def fetchone(self):
+        if not _observing():
+            return super().fetchone()
+        start = time.perf_counter()
+        row = None
+        try:
+            row = super().fetchone()
+            return row
+        finally:
+            _observe(self, self.connection, start, rows=row is not None)
+
+    def fetchmany(self, *args, **kwargs):
+        if not _observing():
+            return super().fetchmany(*args, **kwargs)
+        start = time.perf_counter()
+        rows = []
+        try:
+            rows = super().fetchmany(*args, **kwargs)
+            return rows
+        finally:
+            _observe(self, self.connection, start, rows=len(rows))
+
+    def fetchall(self):
+        if not _observing():
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = []
+        try:
+            rows = super().fetchall()
+            return rows
+        finally:
+            _observe(self, self.connection, start, rows=len(rows))
+
+    def __next__(self):
+        # Rows are stepped lazily, so iterating a cursor is DB time too
+        if not _observing():
+            return super().__next__()
+        start = time.perf_counter()
+        fetched = False
+        try:
+            row = super().__next__()
+            fetched = True
+            return row
+        finally:
+            _observe(self, self.connection, start, rows=fetched)
+
+class TimedConnection(sqlite3.Connection):
+    """Connection handing out TimedCursors, including for conn.execute()"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # The C shortcuts don't go through cursor(), so route them explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        if not _observing():
+            return super().commit()
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _observe(None, self, start, statement=('COMMIT', None))
+
+    def rollback(self):
+        if not _observing():
+            return super().rollback()
+        start = time.perf_counter()
+        try:
+            return super().rollback()
+        finally:
+            _observe(None, self, start, statement=('ROLLBACK', None))
+
+class TimedTemplate(jinja2.Template):
+    """Template whose rendering counts towards the request's template time"""
+
+    def render(self, *args, **kwargs):
+        timer = getattr(_local, 'timer', None)
+        if timer is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            timer.template += time.perf_counter() - start
+
+class EndpointStats:
+    """Rolling latency window and running totals of one endpoint"""
+
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.db = 0.0
+        self.template = 0.0
+        self.statuses = {}
+
+    def add(self, status, total, db, template):
+        self.recent.append(total)
+        self.count += 1
+        self.total += total
+        self.db += db
+        self.template += template
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def quantiles(self):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+class RequestMetrics:
+    """Latency statistics per endpoint"""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.window = window
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, status, total, db, template):
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats(self.window)
+            stats.add(status, total, db, template)
+
+    def snapshot(self):
+        """Per-endpoint counts, totals and rolling quantiles in seconds"""
+        with self.lock:
+            return {
+                endpoint: {
+                    'count': stats.count,
+                    'sum': stats.total,
+                    'db': stats.db,
+                    'template': stats.template,
+                    'statuses': dict(stats.statuses),
+                    'quantiles': stats.quantiles()
+                }
+                for endpoint, stats in sorted(self.endpoints.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+_metrics = RequestMetrics()
+
+def get_metrics():
+    """Get the process-wide request metrics"""
+    return _metrics
+
+def server_timing(timer, total):
+    """Server-Timing header value splitting total into db, tpl and app time"""
+    app = max(total - timer.db - timer.template, 0.0)
+    return (
+        f'db;dur={timer.db * 1000:.2f};desc="{timer.db_calls} queries", '
+        f'tpl;dur={timer.template * 1000:.2f}, '
+        f'app;dur={app * 1000:.2f}, '
+        f'total;dur={total * 1000:.2f}'
+    )
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_prometheus(metrics=None):
+    """Request metrics in the Prometheus text exposition format"""
+    snapshot = (metrics or _metrics).snapshot()
+    lines = [
+        f'# HELP placement_request_duration_seconds Request latency, quantiles over the last {METRICS_WINDOW} requests',
+        '# TYPE placement_request_duration_seconds summary',
+    ]
+    for endpoint, stats in snapshot.items():
+        label = f'endpoint="{_label(endpoint)}"'
+        for q, value in stats['quantiles'].items():
+            lines.append(f'placement_request_duration_seconds{{{label},quantile="{q}"}} {value:.6f}')
+        lines.append(f'placement_request_duration_seconds_sum{{{label}}} {stats["sum"]:.6f}')
+        lines.append(f'placement_request_duration_seconds_count{{{label}}} {stats["count"]}')
+
+    for name, key, help_text in (
+        ('placement_request_db_seconds_total', 'db', 'Time spent in SQLite'),
+        ('placement_request_template_seconds_total', 'template', 'Time spent rendering templates'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for endpoint, stats in snapshot.items():
+            lines.append(f'{name}{{endpoint="{_label(endpoint)}"}} {stats[key]:.6f}')
+
+    lines.append('# HELP placement_requests_total Requests by endpoint and status code')
+    lines.append('# TYPE placement_requests_total counter')
+    for endpoint, stats in snapshot.items():
+        for status, count in sorted(stats['statuses'].items()):
+            lines.append(f'placement_requests_total{{endpoint="{_label(endpoint)}",status="{status}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+def _start_timer():
+    _local.timer = RequestTimer()
+
+def _finish_timer(response):
+    from flask import request
+
+    timer = current_timer()
+    if timer is None:
+        return response
+    total = timer.total()
+    response.headers['Server-Timing'] = server_timing(timer, total)
+    # Unmatched URLs share one label so 404s can't grow the endpoint list
+    endpoint = request.endpoint or 'unmatched'
+    _metrics.record(endpoint, response.status_code, total, timer.db, timer.template)
+    if sqltrace.SQL_TRACE:
+        sqltrace.get_trace().record_request(endpoint, timer)
+    return response
+
+def _clear_timer(exception=None):
+    _local.timer = None
+
+def init_app(app):
+    """Time every request of a Flask app
+
+    Pooled connections must be opened with TimedConnection for DB time to be
+    counted; templates loaded after this call are timed.
+    """
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(_start_timer)
+    app.after_request(_finish_timer)
+    app.teardown_request(_clear_timer)
@@ -0,0 +1,150 @@
+"""Password hashing behind a pluggable, configurable hasher
+
+Hashing and verification run on a process pool, so a burst of logins keeps
+the CPUs busy without holding the GIL inside request handlers. Stored hashes
+carry their method and cost, and needs_rehash() tells when one was made with
+different parameters than the configured hasher's.
+"""
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Hasher and cost (overridable via environment). PASSWORD_WORKERS = 0 hashes
+# on the calling thread instead of the process pool.
+PASSWORD_HASHER = os.environ.get('PLACEMENT_PASSWORD_HASHER', 'pbkdf2')
+PBKDF2_ITERATIONS = int(os.environ.get('PLACEMENT_PBKDF2_ITERATIONS', 260000))
+SCRYPT_COST = int(os.environ.get('PLACEMENT_SCRYPT_COST', 15))
+PASSWORD_WORKERS = int(os.environ.get('PLACEMENT_PASSWORD_WORKERS', os.cpu_count() or 1))
+
+logger = logging.getLogger(__name__)
+
+class Pbkdf2Hasher:
+    """PBKDF2 via werkzeug, stored as pbkdf2:<digest>:<iterations>$salt$hash"""
+
+    def __init__(self, iterations=PBKDF2_ITERATIONS, digest='sha256'):
+        self.method = f'pbkdf2:{digest}:{iterations}'
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, stored):
+        return stored.split('$', 1)[0] != self.method
+
+class ScryptHasher:
+    """hashlib.scrypt with N = 2**cost, stored as scrypt:<n>:<r>:<p>$salt$hash"""
+
+    def __init__(self, cost=SCRYPT_COST, r=8, p=1):
+        self.n, self.r, self.p = 2 ** cost, r, p
+        self.method = f'scrypt:{self.n}:{r}:{p}'
+
+    @staticmethod
+    def derive(password, salt, n, r, p):
+        # scrypt needs 128 * n * r bytes of memory, above hashlib's default cap
+        return hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                              maxmem=256 * n * r, dklen=64).hex()
+
+    def hash(self, password):
+        salt = secrets.token_hex(8)
+        return f'{self.method}${salt}${self.derive(password, salt, self.n, self.r, self.p)}'
+
+    @classmethod
+    def verify(cls, stored, password):
+        method, salt, expected = stored.split('$', 2)
+        _, n, r, p = method.split(':')
+        return hmac.compare_digest(cls.derive(password, salt, int(n), int(r), int(p)), expected)
+
+    def needs_rehash(self, stored):
+        return stored.split('$', 1)[0] != self.method
+
+HASHERS = {
+    'pbkdf2': Pbkdf2Hasher,
+    'scrypt': ScryptHasher,
+}
+
+def verify_password(stored, password):
+    """Check a password against a stored hash of any supported method"""
+    if not stored:
+        return False
+    if stored.startswith('scrypt:'):
+        return ScryptHasher.verify(stored, password)
+    return check_password_hash(stored, password)
+
+_hasher = None
+_pool = None
+_lock = threading.Lock()
+
+def get_hasher():
+    """Get the configured hasher"""
+    global _hasher
+    with _lock:
+        if _hasher is None:
+            if PASSWORD_HASHER not in HASHERS:
+                raise ValueError(f'Unknown password hasher: {PASSWORD_HASHER}')
+            _hasher = HASHERS[PASSWORD_HASHER]()
+        return _hasher
+
+def configure(hasher=None, workers=None):
+    """Swap the hasher and/or resize the hashing pool"""
+    global _hasher, _pool, PASSWORD_WORKERS
+    with _lock:
+        if hasher is not None:
+            _hasher = hasher
+        if workers is not None:
+            PASSWORD_WORKERS = workers
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+                _pool = None
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None and PASSWORD_WORKERS > 0:
+            # Not forked: the app's log, writer and export threads may hold
+            # locks a forked child would inherit held
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS,
+                                        mp_context=multiprocessing.get_context('forkserver'))
+        return _pool
+
+def _run(func, *args):
+    pool = _get_pool()
+    if pool is None:
+        return func(*args)
+    return pool.submit(func, *args).result()
+
+def hash_password(password):
+    """Hash a password with the configured hasher"""
+    return _run(get_hasher().hash, password)
+
+def hash_passwords(passwords):
+    """Hash many passwords, spread across the pool"""
+    passwords = list(passwords)
+    hasher = get_hasher()
+    pool = _get_pool()
+    if pool is None:
+        return [hasher.hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (4 * PASSWORD_WORKERS))
+    return list(pool.map(hasher.hash, passwords, chunksize=chunksize))
+
+def check_password(stored, password):
+    """Verify a password against its stored hash
+
+    A malformed stored hash, or one of an unsupported method, matches no
+    password.
+    """
+    try:
+        return _run(verify_password, stored, password)
+    except (ValueError, IndexError) as e:
+        # Logged here rather than in the pool worker, which has no log writer
+        logger.warning("Unreadable password hash: %s", e, extra={'method': stored.split('$', 1)[0]})
+        return False
+
+def needs_rehash(stored):
+    """Whether a stored hash was made with other parameters than the configured hasher's"""
+    return get_hasher().needs_rehash(stored)
@@ -0,0 +1,286 @@
+"""SQL statement tracing for debugging query patterns
+
+When PLACEMENT_SQL_TRACE=1, every pooled connection gets SQLite's trace
+callback, which sees each statement SQLite actually runs (including the
+implicit BEGINs and every row of an executemany), and a progress handler
+that counts virtual machine steps as a measure of the work a query does.
+The TimedCursor in metrics.py adds each statement's duration and rows
+returned. Statements are aggregated per normalized query, where literals
+and placeholder lists are collapsed, and per endpoint, so N+1 patterns show
+up as a query run many times by one request. The trace callback sees the
+statement with its parameters expanded, so named and numbered placeholders,
+NULL and blob literals are folded to ? like any other literal, and both
+sides land on the same query. Statements slower than
+SLOW_QUERY_MS are logged with their EXPLAIN QUERY PLAN.
+"""
+import functools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Tracing switch, slow statement threshold, how many times one request may run
+# the same query before it is reported, and how many slow statements are kept
+# (overridable via environment)
+SQL_TRACE = os.environ.get('PLACEMENT_SQL_TRACE', '0') == '1'
+SLOW_QUERY_MS = float(os.environ.get('PLACEMENT_SLOW_QUERY_MS', 100))
+REPEATED_QUERY_CALLS = int(os.environ.get('PLACEMENT_REPEATED_QUERY_CALLS', 10))
+SLOW_QUERY_LOG_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+# The progress handler runs every PROGRESS_STEPS virtual machine instructions
+PROGRESS_STEPS = 1000
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING = re.compile(r"(?:(?<!\w)[xX])?'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b')
+_PARAMETER = re.compile(r'[:@$][A-Za-z_]\w*|\?\d+')
+_NULL = re.compile(r'\bNULL\b', re.I)
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_PLACEHOLDER_ROWS = re.compile(r'\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+@functools.lru_cache(maxsize=4096)
+def normalize(sql):
+    """Query text with literals replaced by ? and placeholder lists collapsed
+
+    e.g. "SELECT * FROM users WHERE id IN (1, 2, 3)" becomes
+    "SELECT * FROM users WHERE id IN (?...)", and so does
+    "SELECT * FROM users WHERE id IN (:a, :b)".
+    """
+    sql = _COMMENT.sub(' ', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _PARAMETER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _NULL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip().rstrip(';').strip()
+    sql = _PLACEHOLDER_LIST.sub('(?...)', sql)
+    return _PLACEHOLDER_ROWS.sub('(?...)', sql)
+
+class Statement:
+    """One execution of a query, as seen by its cursor"""
+
+    __slots__ = ('key', 'sql', 'params', 'elapsed', 'rows', 'logged')
+
+    def __init__(self, key, sql, params):
+        self.key = key
+        self.sql = sql
+        self.params = params
+        self.elapsed = 0.0
+        self.rows = 0
+        self.logged = False
+
+class QueryStats:
+    """Totals per normalized query"""
+
+    __slots__ = ('calls', 'statements', 'total', 'max', 'rows', 'steps')
+
+    def __init__(self):
+        self.calls = 0          # execute()/executemany() calls
+        self.statements = 0     # statements SQLite ran, from the trace callback
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.steps = 0
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'statements': self.statements,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total * 1000 / self.calls if self.calls else 0.0,
+            'max_ms': self.max * 1000,
+            'rows': self.rows,
+            'vm_steps': self.steps
+        }
+
+class EndpointQueries:
+    """Statements run by the requests of one endpoint"""
+
+    __slots__ = ('requests', 'calls', 'statements', 'max_calls', 'total', 'repeated')
+
+    def __init__(self):
+        self.requests = 0
+        self.calls = 0
+        self.statements = 0
+        self.max_calls = 0
+        self.total = 0.0
+        self.repeated = {}      # query -> most calls seen in one request
+
+class SqlTrace:
+    """Aggregated statements, per-endpoint counts and the slow statement log"""
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, repeated_calls=REPEATED_QUERY_CALLS):
+        self.slow_ms = slow_ms
+        self.repeated_calls = repeated_calls
+        self.queries = {}
+        self.endpoints = {}
+        self.slow = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self.lock = threading.Lock()
+
+    def _query(self, key):
+        stats = self.queries.get(key)
+        if stats is None:
+            stats = self.queries[key] = QueryStats()
+        return stats
+
+    def traced(self, sql):
+        """Count a statement SQLite is about to run"""
+        with self.lock:
+            self._query(normalize(sql)).statements += 1
+
+    def observe(self, cursor, conn, elapsed, rows, statement, timer):
+        """Add a timed cursor call: an execute when statement is (sql, params), else a fetch"""
+        steps = take_steps(conn)
+        if statement is not None:
+            sql, params = statement
+            current = Statement(normalize(sql), sql, params)
+            if cursor is not None:
+                cursor._statement = current
+        else:
+            current = getattr(cursor, '_statement', None)
+            if current is None:
+                return
+        current.elapsed += elapsed
+        current.rows += rows
+
+        with self.lock:
+            stats = self._query(current.key)
+            if statement is not None:
+                stats.calls += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, current.elapsed)
+            stats.rows += rows
+            stats.steps += steps
+        if timer is not None and statement is not None:
+            timer.queries[current.key] = timer.queries.get(current.key, 0) + 1
+
+        if not current.logged and current.elapsed * 1000 >= self.slow_ms:
+            current.logged = True
+            self.log_slow(conn, current)
+
+    def log_slow(self, conn, statement):
+        """Record a slow statement with its query plan"""
+        plan = explain(conn, statement.sql, statement.params)
+        entry = {
+            'query': statement.key,
+            'elapsed_ms': round(statement.elapsed * 1000, 3),
+            'rows': statement.rows,
+            'plan': plan,
+            'at': time.time()
+        }
+        with self.lock:
+            self.slow.append(entry)
+        logger.warning("Slow query", extra=entry)
+
+    def record_request(self, endpoint, timer):
+        """Fold one finished request's statements into its endpoint's counts"""
+        calls = sum(timer.queries.values())
+        repeated = {key: count for key, count in timer.queries.items() if count >= self.repeated_calls}
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointQueries()
+            stats.requests += 1
+            stats.calls += calls
+            stats.statements += timer.statements
+            stats.max_calls = max(stats.max_calls, calls)
+            stats.total += timer.db
+            new = {key: count for key, count in repeated.items() if key not in stats.repeated}
+            for key, count in repeated.items():
+                stats.repeated[key] = max(stats.repeated.get(key, 0), count)
+        for key, count in new.items():
+            logger.warning("Repeated query", extra={'endpoint': endpoint, 'calls': count, 'query': key})
+
+    def top_queries(self, limit=50, sort='total_ms'):
+        """The queries with the highest sort value, as dicts"""
+        with self.lock:
+            queries = [dict(stats.to_dict(), query=key) for key, stats in self.queries.items()]
+        queries.sort(key=lambda query: query[sort], reverse=True)
+        return queries[:limit]
+
+    def endpoint_summary(self):
+        """Statements per request and repeated queries for each endpoint"""
+        with self.lock:
+            return [
+                {
+                    'endpoint': endpoint,
+                    'requests': stats.requests,
+                    'calls_per_request': stats.calls / stats.requests,
+                    'statements_per_request': stats.statements / stats.requests,
+                    'max_calls': stats.max_calls,
+                    'db_ms_per_request': stats.total * 1000 / stats.requests,
+                    'repeated': sorted(stats.repeated.items(), key=lambda item: -item[1])
+                }
+                for endpoint, stats in sorted(self.endpoints.items(), key=lambda item: -item[1].calls)
+            ]
+
+    def slow_queries(self):
+        with self.lock:
+            return list(reversed(self.slow))
+
+    def reset(self):
+        with self.lock:
+            self.queries.clear()
+            self.endpoints.clear()
+            self.slow.clear()
+
+def explain(conn, sql, params):
+    """EXPLAIN QUERY PLAN lines of a statement, or a note why there are none"""
+    try:
+        # The plain sqlite3 execute keeps the EXPLAIN itself out of the trace
+        rows = sqlite3.Connection.execute(conn, f'EXPLAIN QUERY PLAN {sql}', params or ()).fetchall()
+    except sqlite3.Error as e:
+        return [f'(no plan: {e})']
+    finally:
+        take_steps(conn)
+    return [f"{'  ' * depth(rows, row)}{row[3]}" for row in rows]
+
+def depth(rows, row):
+    """Nesting level of a query plan row, from its parent ids"""
+    parents = {r[0]: r[1] for r in rows}
+    level, parent = 0, row[1]
+    while parent in parents:
+        level += 1
+        parent = parents[parent]
+    return level
+
+def take_steps(conn):
+    """VM steps counted on conn since the last call"""
+    counter = getattr(conn, '_vm_steps', None)
+    if not counter:
+        return 0
+    steps = counter[0] * PROGRESS_STEPS
+    counter[0] = 0
+    return steps
+
+_trace = SqlTrace()
+
+def get_trace():
+    """Get the process-wide SQL trace"""
+    return _trace
+
+def install(conn, current_timer):
+    """Attach the trace callback and progress handler to a new connection
+
+    current_timer() returns the running request's timer, whose statement
+    count the trace callback increments.
+    """
+    counter = conn._vm_steps = [0]
+
+    def progress():
+        counter[0] += 1
+        return 0
+
+    def traced(sql):
+        _trace.traced(sql)
+        timer = current_timer()
+        if timer is not None:
+            timer.statements += 1
+
+    conn.set_progress_handler(progress, PROGRESS_STEPS)
+    conn.set_trace_callback(traced)
@@ -74,18 +74,7 @@ def profile():
     # Calculate eligibility status
     is_eligible = False
     if profile:
-        project_count = len(profile['projects'].split(',')) if profile['projects'] else 0
-        is_eligible = (
-            profile['attendance_percentage'] >= criteria['min_attendance'] and
-            profile['weekly_assessment_score'] >= criteria['min_assessment_score'] and
-            profile['semester_cgpa'] >= criteria['min_cgpa'] and
-            profile['leetcode_problems'] >= criteria['min_leetcode_problems'] and
-            project_count >= criteria['min_projects'] and
-            (not criteria['require_portfolio'] or profile['portfolio_link']) and
-            (not criteria['require_leetcode_profile'] or profile['leetcode_profile']) and
-            (not criteria['require_github_profile'] or profile['github_profile']) and
-            (not criteria['require_linkedin_profile'] or profile['linkedin_profile'])
-        )
+        is_eligible = db.is_profile_eligible(profile, criteria)
     
     return render_template('dashboard.html', 
                           user=user, 
@@ -0,0 +1,249 @@
+"""Bulk student import from registrar CSV/XLSX files
+
+Rows are streamed from the upload and validated one by one, then written
+in batches of IMPORT_BATCH_ROWS: the new students' initial passwords are
+hashed in parallel on the password hashing pool, and users and profiles are
+upserted with executemany in one transaction per batch. Eligibility is recomputed
+once after the last batch.
+"""
+import contextlib
+import os
+import sqlite3
+import time
+
+import database as db
+import passwords
+
+# Rows per write transaction (overridable via environment) and how many row
+# errors a report lists
+IMPORT_BATCH_ROWS = int(os.environ.get('PLACEMENT_IMPORT_BATCH_ROWS', 500))
+IMPORT_MAX_ERRORS = 1000
+
+REQUIRED_COLUMNS = ['username', 'email', 'department']
+
+# Numeric profile columns: (converter, minimum, maximum)
+NUMERIC_COLUMNS = {
+    'semester_cgpa': (float, 0, 10),
+    'leetcode_problems': (int, 0, None),
+    'weekly_assessment_score': (float, 0, 100),
+    'attendance_percentage': (float, 0, 100),
+}
+
+def normalize_header(name):
+    """Map a spreadsheet header such as "Semester CGPA" to its column name"""
+    return str(name or '').strip().lower().replace(' ', '_')
+
+@contextlib.contextmanager
+def read_rows(file, filename):
+    """Open a CSV or XLSX upload and yield (columns, rows)
+
+    columns are the normalized header names and rows yields
+    (row number, {column: value}) for every non-blank data row. Row numbers
+    match the spreadsheet, so the header is row 1.
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    workbook = None
+    if extension == '.csv':
+        import csv
+        import io
+
+        reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    elif extension == '.xlsx':
+        import openpyxl
+
+        # read_only mode streams rows instead of loading the whole sheet
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        reader = workbook.active.iter_rows(values_only=True)
+    else:
+        raise ValueError('Upload a .csv or .xlsx file')
+
+    try:
+        header = next(reader, None)
+        if not header:
+            raise ValueError('The file is empty')
+        columns = [normalize_header(name) for name in header]
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+        yield columns, _data_rows(reader, columns)
+    finally:
+        # A read_only workbook keeps the upload open until closed
+        if workbook is not None:
+            workbook.close()
+
+def _data_rows(reader, columns):
+    for number, values in enumerate(reader, start=2):
+        row = {column: value for column, value in zip(columns, values) if column}
+        if any(value not in (None, '') for value in row.values()):
+            yield number, row
+
+def clean_row(row, profile_columns):
+    """Validate one row and convert it to a student dict
+
+    Returns (student, errors); the student is None when there are errors.
+    """
+    errors = []
+
+    def text(column):
+        value = row.get(column)
+        if value is None:
+            return None
+        # Spreadsheet cells can hold numbers, e.g. a numeric username
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value).strip() or None
+
+    student = {
+        'username': text('username'),
+        'email': text('email'),
+        'department': text('department'),
+        'specialization': text('specialization'),
+        'password': text('password'),
+    }
+    for column in REQUIRED_COLUMNS:
+        if not student[column]:
+            errors.append(f'{column} is required')
+    if student['email'] and '@' not in student['email']:
+        errors.append('email is not a valid address')
+
+    for column in profile_columns:
+        if column not in NUMERIC_COLUMNS:
+            student[column] = text(column)
+            continue
+        convert, minimum, maximum = NUMERIC_COLUMNS[column]
+        value = text(column)
+        if value is None:
+            student[column] = None
+            continue
+        try:
+            number = float(value)
+            if convert is int:
+                if not number.is_integer():
+                    raise ValueError
+                number = int(number)
+        except ValueError:
+            errors.append(f'{column} must be {"a whole number" if convert is int else "a number"}')
+            continue
+        if number < minimum or (maximum is not None and number > maximum):
+            errors.append(f'{column} must be between {minimum} and {maximum}' if maximum is not None
+                          else f'{column} must be at least {minimum}')
+            continue
+        student[column] = number
+
+    return (None, errors) if errors else (student, [])
+
+class ImportReport:
+    """Counts and per-row errors of one import"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.eligibility_changed = 0
+        self.started = time.perf_counter()
+
+    def error(self, number, username, messages):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'row': number, 'username': username, 'errors': messages})
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'eligibility_changed': self.eligibility_changed,
+            'elapsed': round(time.perf_counter() - self.started, 3)
+        }
+
+def _write_batch(batch, profile_columns, report):
+    """Check a batch against existing users, hash new passwords and upsert it"""
+    existing = db.find_users(
+        [student['username'] for _, student in batch],
+        [student['email'] for _, student in batch]
+    )
+    if existing is None:
+        for number, student in batch:
+            report.error(number, student['username'], ['database error while checking existing accounts'])
+        return
+    by_username = {user['username']: user for user in existing}
+    email_owner = {user['email']: user['username'] for user in existing}
+
+    students, new_students = [], []
+    for number, student in batch:
+        user = by_username.get(student['username'])
+        errors = []
+        if user and user['role'] != 'student':
+            errors.append('username belongs to a non-student account')
+        if email_owner.get(student['email'], student['username']) != student['username']:
+            errors.append('email is already used by another account')
+        if not user and not student['password']:
+            errors.append('password is required for new students')
+        if errors:
+            report.error(number, student['username'], errors)
+            continue
+        if user:
+            # Existing students keep their password
+            student['password'] = None
+        else:
+            new_students.append(student)
+        students.append((number, student))
+
+    if not students:
+        return
+
+    hashes = passwords.hash_passwords(student['password'] for student in new_students)
+    for student, hashed in zip(new_students, hashes):
+        student['password'] = hashed
+
+    try:
+        db.import_student_batch([student for _, student in students], profile_columns)
+    except sqlite3.Error as e:
+        for number, student in students:
+            report.error(number, student['username'], [f'database error: {e}'])
+        return
+    report.created += len(new_students)
+    report.updated += len(students) - len(new_students)
+
+def import_students(file, filename, batch_size=IMPORT_BATCH_ROWS):
+    """Import students from a CSV or XLSX file object and return the report as a dict
+
+    Raises ValueError when the file itself cannot be read (wrong type, no
+    header or missing required columns).
+    """
+    report = ImportReport()
+    seen_usernames, seen_emails = set(), set()
+    batch = []
+    with read_rows(file, filename) as (columns, rows):
+        # Only profile columns present in the file are written
+        profile_columns = [column for column in db.IMPORT_PROFILE_COLUMNS if column in columns]
+
+        for number, row in rows:
+            report.rows += 1
+            student, errors = clean_row(row, profile_columns)
+            if student:
+                if student['username'] in seen_usernames:
+                    errors.append('username appears earlier in the file')
+                if student['email'] in seen_emails:
+                    errors.append('email appears earlier in the file')
+            if errors:
+                report.error(number, (student or {}).get('username') or row.get('username'), errors)
+                continue
+            seen_usernames.add(student['username'])
+            seen_emails.add(student['email'])
+            batch.append((number, student))
+            if len(batch) >= batch_size:
+                _write_batch(batch, profile_columns, report)
+                batch = []
+    if batch:
+        _write_batch(batch, profile_columns, report)
+
+    if report.created or report.updated:
+        report.eligibility_changed = db.update_all_eligibility(flips_only=True) or 0
+    return report.to_dict()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import database as db
+
+class ApproveStudentsTest(unittest.TestCase):
+    """Bulk approval by filters must never widen to every student"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='placement_test_')
+        self.saved_path = db.DATABASE_PATH
+        db.configure_pool(path=os.path.join(self.workdir, 'test.db'))
+        db.init_db()
+
+        conn = sqlite3.connect(db.DATABASE_PATH)
+        for i in range(5):
+            user_id = conn.execute(
+                "INSERT INTO users (username, password, email, role, department) VALUES (?, '', ?, 'student', ?)",
+                (f's{i}', f's{i}@example.com', 'CSE' if i % 2 else 'ECE')
+            ).lastrowid
+            conn.execute('INSERT INTO student_profiles (user_id, is_approved) VALUES (?, 0)', (user_id,))
+        conn.commit()
+        conn.close()
+
+        # Imported here so the app's init_db runs against the test database
+        from app import app
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['user_id'] = 1
+            session['role'] = 'admin'
+
+    def tearDown(self):
+        db.configure_pool(path=self.saved_path)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def approved_count(self):
+        conn = sqlite3.connect(os.path.join(self.workdir, 'test.db'))
+        try:
+            return conn.execute('SELECT COUNT(*) FROM student_profiles WHERE is_approved = 1').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_blank_filters_are_rejected(self):
+        for filters in ({'department': ''}, {'q': '   '}, {'department': None}, {'min_cgpa': None, 'q': ''}):
+            response = self.client.post('/admin/approve_students', json={'approved': True, 'filters': filters})
+            self.assertEqual(response.status_code, 400, filters)
+        self.assertEqual(self.approved_count(), 0)
+
+    def test_filters_approve_only_matching_students(self):
+        response = self.client.post('/admin/approve_students',
+                                    json={'approved': True, 'filters': {'department': 'CSE'}})
+        self.assertEqual(response.get_json(), {'success': True, 'changed': 2})
+        self.assertEqual(self.approved_count(), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import database as db
+import sqltrace
+
+class NormalizeTest(unittest.TestCase):
+    def test_parameters_fold_like_positional_placeholders(self):
+        expected = sqltrace.normalize('UPDATE users SET email = ? WHERE id = ?')
+        for sql in (
+            'UPDATE users SET email = :email WHERE id = :id',
+            'UPDATE users SET email = ?1 WHERE id = ?2',
+            'UPDATE users SET email = @email WHERE id = $id',
+            "UPDATE users SET email = 'a@b.c' WHERE id = 5",
+            'UPDATE users SET email = NULL WHERE id = -5',
+            "UPDATE users SET email = x'00ff' WHERE id = 5",
+        ):
+            self.assertEqual(sqltrace.normalize(sql), expected, sql)
+
+    def test_named_placeholder_lists_collapse(self):
+        self.assertEqual(
+            sqltrace.normalize('SELECT * FROM users WHERE id IN (:a, :b, NULL)'),
+            sqltrace.normalize('SELECT * FROM users WHERE id IN (1, 2, 3)')
+        )
+
+class ProfileUpsertTraceTest(unittest.TestCase):
+    """The trace callback and the cursor must count the upsert under one query"""
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='placement_test_')
+        self.saved = (sqltrace.SQL_TRACE, db.DB_WRITE_QUEUE, db.DATABASE_PATH)
+        sqltrace.SQL_TRACE = True
+        db.configure_pool(path=os.path.join(self.workdir, 'test.db'))
+        db.init_db()
+
+        conn = sqlite3.connect(db.DATABASE_PATH)
+        self.user_id = conn.execute(
+            "INSERT INTO users (username, password, email, role) VALUES ('s1', '', 's1@example.com', 'student')"
+        ).lastrowid
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        sqltrace.SQL_TRACE, db.DB_WRITE_QUEUE, saved_path = self.saved
+        # Also stops the writer thread
+        db.configure_pool(path=saved_path)
+        sqltrace.get_trace().reset()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def save_profile(self):
+        form = dict.fromkeys(db.PROFILE_FORM_COLUMNS)
+        form.update(semester_cgpa=9.1, leetcode_problems=150, projects='a,b,c')
+        sqltrace.get_trace().reset()
+        self.assertTrue(db.update_student_profile(self.user_id, form))
+        return sqltrace.get_trace().queries[sqltrace.normalize(db.PROFILE_UPSERT_SQL)]
+
+    def test_direct_write(self):
+        db.DB_WRITE_QUEUE = False
+        stats = self.save_profile()
+        self.assertEqual((stats.calls, stats.statements), (1, 1))
+
+    def test_write_queue(self):
+        db.DB_WRITE_QUEUE = True
+        stats = self.save_profile()
+        self.assertEqual((stats.calls, stats.statements), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
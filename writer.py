@@ -0,0 +1,160 @@
+"""Single writer thread with group commit
+
+In write-queue mode every mutation is a transaction body, a function taking
+a connection, handed to one writer thread instead of being run on the
+request's own connection. The writer takes whatever bodies are waiting, up
+to WRITE_BATCH_SIZE, runs them in one IMMEDIATE transaction and commits once,
+so concurrent writers neither wait on SQLite's lock nor pay one commit each.
+Each body runs inside its own savepoint, so a failing body is rolled back on
+its own while the rest of the batch still commits. Callers get a
+concurrent.futures.Future holding the body's result once its batch has
+committed.
+
+Bodies must not commit or roll back themselves, and must not wait on the
+queue, since that would wait on their own batch.
+"""
+import concurrent.futures
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Bodies run per transaction (overridable via environment)
+WRITE_BATCH_SIZE = int(os.environ.get('PLACEMENT_WRITE_BATCH_SIZE', 64))
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class WriteQueue:
+    """Runs transaction bodies on a dedicated thread, committing them in batches"""
+
+    def __init__(self, connect, batch_size=WRITE_BATCH_SIZE):
+        self.connect = connect
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.jobs = 0
+        self.failed = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_batch = 0
+        self.commit_time = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, body, *args):
+        """Queue body(conn, *args) and return a Future for its result"""
+        if self.on_writer_thread():
+            # The caller's own batch could never commit
+            raise RuntimeError('A transaction body cannot submit to the write queue')
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Write queue is closed')
+            self._queue.put((future, body, args))
+        return future
+
+    def on_writer_thread(self):
+        """Whether the caller is a body running on the writer thread"""
+        return threading.current_thread() is self._thread
+
+    def close(self):
+        """Commit whatever is queued, then stop the writer"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        if not self.on_writer_thread():
+            self._thread.join()
+
+    def _run(self):
+        conn = None
+        try:
+            while True:
+                job = self._queue.get()
+                if job is _STOP:
+                    return
+                batch = [job]
+                stop = False
+                # Whatever queued up while the last batch committed goes in this one
+                while len(batch) < self.batch_size:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is _STOP:
+                        stop = True
+                        break
+                    batch.append(job)
+                try:
+                    if conn is None:
+                        conn = self.connect()
+                    self._commit(conn, batch)
+                except sqlite3.Error as e:
+                    logger.error("Write batch failed: %s", e, extra={'jobs': len(batch)})
+                    self.failed_batches += 1
+                    # Every body that had not failed on its own fails with the transaction
+                    for future, _, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                            self.failed += 1
+                if stop:
+                    return
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _commit(self, conn, batch):
+        """Run a batch of bodies in one transaction and resolve their futures"""
+        done = []
+        start = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for future, body, args in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT job')
+                try:
+                    result = body(conn, *args)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO job')
+                    conn.execute('RELEASE job')
+                    future.set_exception(e)
+                    self.failed += 1
+                else:
+                    conn.execute('RELEASE job')
+                    done.append((future, result))
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                pass
+            raise
+
+        self.jobs += len(batch)
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(batch))
+        self.commit_time += time.perf_counter() - start
+        for future, result in done:
+            future.set_result(result)
+
+    def stats(self):
+        """Get job, batch and commit counters"""
+        return {
+            'queued': self._queue.qsize(),
+            'jobs': self.jobs,
+            'failed': self.failed,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'mean_batch': self.jobs / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch,
+            'total_batch_time': self.commit_time
+        }